@@ -12,6 +12,7 @@ App states:
 * collate / export stored data (zip archive, archive, xlsxs)
 """
 
+import hashlib
 import logging
 
 import streamlit as st
@@ -25,6 +26,28 @@ logger = logging.getLogger(__name__)
 st.set_page_config(layout="centered")
 
 
+class LoginFailed(Exception):
+    pass
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _verify(username: str, pw_sha256: str, _user: User) -> bool:
+    # `_user` is not hashed by streamlit, so the raw password never ends up in the cache key.
+    # Failed attempts raise instead of returning False so they are not cached and
+    # keep passing through the rate limiter.
+    if not check_is_legit_user(_user):
+        raise LoginFailed(f"Login failed for {username=}")
+    return True
+
+
+def is_legit_user(user: User) -> bool:
+    pw_sha256 = hashlib.sha256(user.password.encode()).hexdigest()
+    try:
+        return _verify(user.username, pw_sha256, user)
+    except LoginFailed:
+        return False
+
+
 def do_login():
     logger.info("Login step")
     st.markdown("## Login")
@@ -43,12 +66,14 @@ def do_login():
                 logger.info("Login failed")
                 user = None
 
-            sto.init_settings(username)
             if user is not None:
-                if check_is_legit_user(user):
+                if is_legit_user(user):
                     st.info("Successfully logged in")
                     logger.info("Login succeeded")
 
+                    # only verified users get a (cached) settings object
+                    sto.init_settings(user.username)
+
                     app_state = sto.get_app_state()
                     app_state.is_logged_in = True
                     app_state.state = sto.States.UPLOAD
@@ -33,10 +33,8 @@ def compress(do_create_zipfile: bool, settings: sto.Settings) -> bytes:
     if do_create_zipfile and (
         compiled_shop_info_path.exists() or compiled_items_info_path.exists()
     ):
-        path_archive = utils.create_zipfile(root_dir_extraction)
-        logger.debug(f"Loading {path_archive=} as bytes")
-        with path_archive.open("rb") as f:
-            archive_bytes = f.read()
+        archive_bytes = utils.create_zipfile_bytes(root_dir_extraction)
+        logger.debug(f"Created zip archive of {len(archive_bytes):_} bytes")
 
         st.info("Zip file extractions.zip created")
 
@@ -52,8 +50,37 @@ def compress(do_create_zipfile: bool, settings: sto.Settings) -> bytes:
     return archive_bytes
 
 
-def make_excel(settings: sto.Settings) -> bytes:
-    path_excel = utils.write_excel_workbook(settings)
+def get_file_signature(path: Path) -> tuple[str, float, int]:
+    stat = path.stat()
+    return str(path), stat.st_mtime, stat.st_size
+
+
+# process-wide caches, bounded since every re-collect adds a new key: two compiled
+# files per user for the frames and csvs, one workbook per user
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def load_compiled(path_str: str, mtime: float, size: int) -> pl.DataFrame:
+    # mtime and size are only part of the cache key, so changed files are re-read
+    logger.debug(f"Reading {path_str}")
+    return pl.read_parquet(path_str)
+
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def parquet_to_csv(path_str: str, mtime: float, size: int) -> str:
+    logger.debug(f"Converting {path_str} to csv")
+    return load_compiled(path_str, mtime, size).write_csv(separator=";")
+
+
+@st.cache_data(ttl=600, max_entries=16, show_spinner=False)
+def make_excel(
+    _settings: sto.Settings,
+    shop_signature: tuple[str, float, int],
+    items_signature: tuple[str, float, int],
+) -> bytes:
+    path_excel = utils.write_excel_workbook(
+        _settings,
+        shops=load_compiled(*shop_signature),
+        items=load_compiled(*items_signature),
+    )
 
     with path_excel.open("rb") as f:
         excel_bytes = f.read()
@@ -106,12 +133,12 @@ st.download_button(
 ##### Download: csvs
 
 if compiled_shop_info_path.exists():
-    shop_csv = pl.read_parquet(compiled_shop_info_path).write_csv(separator=";")
+    shop_csv = parquet_to_csv(*get_file_signature(compiled_shop_info_path))
 else:
     shop_csv = ""
 
-if compiled_shop_info_path.exists():
-    items_csv = pl.read_parquet(compiled_items_info_path).write_csv(separator=";")
+if compiled_items_info_path.exists():
+    items_csv = parquet_to_csv(*get_file_signature(compiled_items_info_path))
 else:
     items_csv = ""
 
@@ -136,7 +163,11 @@ st.download_button(
 ##### Download: excel
 
 if compiled_items_info_path.exists() and compiled_shop_info_path.exists():
-    excel_bytes = make_excel(settings)
+    excel_bytes = make_excel(
+        settings,
+        get_file_signature(compiled_shop_info_path),
+        get_file_signature(compiled_items_info_path),
+    )
 else:
     excel_bytes = b""
 
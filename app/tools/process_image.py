@@ -1,8 +1,9 @@
 import logging
+from collections import OrderedDict
 
 import polars as pl
 import streamlit as st
-from PIL.Image import Image
+from PIL.Image import Image, Resampling
 from streamlit_cropper import st_cropper
 
 import library.handler as handler
@@ -13,6 +14,56 @@ import library.vlms as vlms
 
 logger = logging.getLogger(__name__)
 
+VAR_THUMBNAILS = "thumbnails"
+MAX_THUMBNAILS = 16
+VAR_ROTATED_PREVIEWS = "rotated_previews"
+MAX_ROTATED_PREVIEWS = 8
+
+
+def get_thumbnail(
+    image: Image, size: tuple[int, int], key: tuple | None = None
+) -> Image:
+    # bilinear is visibly indistinguishable from the default bicubic at preview sizes
+    thumbnails: OrderedDict[tuple, Image] = st.session_state.setdefault(
+        VAR_THUMBNAILS, OrderedDict()
+    )
+    if key is not None and key in thumbnails:
+        thumbnails.move_to_end(key)
+        return thumbnails[key]
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail(size, Resampling.BILINEAR)
+
+    if key is not None:
+        thumbnails[key] = thumbnail
+        if len(thumbnails) > MAX_THUMBNAILS:
+            thumbnails.popitem(last=False)
+
+    return thumbnail
+
+
+def get_rotated_preview(
+    image: Image, degrees: int, size: tuple[int, int], image_key: str
+) -> Image:
+    # rotating the thumbnail instead of the full resolution image is orders of magnitude cheaper
+    previews: OrderedDict[tuple, Image] = st.session_state.setdefault(
+        VAR_ROTATED_PREVIEWS, OrderedDict()
+    )
+    key = (image_key, degrees, size)
+    if key in previews:
+        previews.move_to_end(key)
+        return previews[key]
+
+    thumbnail = get_thumbnail(image, size, key=(image_key, size))
+    preview = thumbnail.rotate(360 - degrees, expand=True)
+    preview.thumbnail(size, Resampling.BILINEAR)
+
+    previews[key] = preview
+    if len(previews) > MAX_ROTATED_PREVIEWS:
+        previews.popitem(last=False)
+
+    return preview
+
 
 def do_upload_image():
     logger.info("Upload image")
@@ -54,7 +105,7 @@ def do_rotate():
         msg = "Something went wrong, do_rotate expected app_state.image_handler not to be None!"
         raise ValueError(msg)
 
-    image = app_state.image_handler.original_image.copy()
+    image = app_state.image_handler.original_image
 
     degrees = st.number_input(
         "Set image rotation 🔁",
@@ -62,11 +113,13 @@ def do_rotate():
         max_value=360,
         value=0,
     )
-    image_rotated = image.rotate(360 - degrees, expand=True)
-
-    img_plot = image_rotated.copy()
 
-    img_plot.thumbnail((150, 300))
+    img_plot = get_rotated_preview(
+        image,
+        degrees,
+        (150, 300),
+        image_key=str(app_state.image_handler.target_directory),
+    )
 
     cols = st.columns(3)
     with cols[1]:
@@ -79,6 +132,7 @@ def do_rotate():
     is_done = st.button("Continue", use_container_width=True)
 
     if is_done:
+        image_rotated = image.rotate(360 - degrees, expand=True)
         app_state.image_handler.angle = degrees
         app_state.image_handler.rotated = True
         app_state.image_handler.edited_image = image_rotated
@@ -102,15 +156,14 @@ def do_crop():
 
     image = app_state.image_handler.edited_image
 
-    image_cropped: Image = st_cropper(
+    image_cropped, box = st_cropper(
         image.copy(),  # type: ignore
         realtime_update=True,
         box_color="#ecdb93",  # aspect_ratio=None
+        return_type="both",
     )
 
-    img_plot = image_cropped.copy()
-
-    img_plot.thumbnail((150, 300))
+    img_plot = get_thumbnail(image_cropped, (150, 300))
 
     cols = st.columns(3)
     with cols[1]:
@@ -120,6 +173,12 @@ def do_crop():
 
     if is_done:
         app_state.image_handler.cropped = True
+        app_state.image_handler.crop_box = (
+            box["left"],
+            box["top"],
+            box["width"],
+            box["height"],
+        )
         app_state.image_handler.edited_image = image_cropped
         app_state.state = sto.States.EXTRACT
         app_state.image_handler.save_edited_image(mkdir=False, overwrite=True)
@@ -143,7 +202,13 @@ def do_extract():
     client = vlms.get_anthropic_client(settings.services)
     logger.debug("Extracting data from image")
 
-    base64_image = app_state.image_handler.edited_image_base64
+    if app_state.image_handler.edited_image is None:
+        msg = "Something went wrong, do_extract expected app_state.image_handler.edited_image not to be None!"
+        raise ValueError(msg)
+
+    base64_image = utils.base64_encode_image_bytes(
+        utils.prepare_vlm_image(app_state.image_handler.edited_image)
+    )
 
     with st.spinner("Extracting"):
         extracted_receipt_info = vlms.make_anthropic_request(
@@ -190,8 +255,18 @@ def do_wrangle():
     cols = st.columns(2)
     with cols[0]:
         st.write("Image used for info extraction:")
-        img_plot = app_state.image_handler.edited_image.copy()
-        img_plot.thumbnail((300, 600))
+        thumbnail_size = (300, 600)
+        img_plot = get_thumbnail(
+            app_state.image_handler.edited_image,
+            thumbnail_size,
+            key=(
+                str(app_state.image_handler.target_directory),
+                app_state.image_handler.angle,
+                # crops of equal size but different offsets need their own preview
+                app_state.image_handler.crop_box,
+                thumbnail_size,
+            ),
+        )
         st.image(img_plot, caption="Rotated & cropped image")
     with cols[1]:
         st.write("Shop info:")
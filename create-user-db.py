@@ -1,6 +1,7 @@
 "Interactively creates the database for the intended users and their hashed passwords"
 
 import logging
+import os
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
@@ -12,6 +13,9 @@ from library import fine_logging
 logger = logging.getLogger(__name__)
 fine_logging.setup_logging(Path("logger-config.json"))
 
+# the bcrypt cost is stored in the hash itself, so logins verify with the rounds used here
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+
 
 @dataclass
 class User:
@@ -20,7 +24,7 @@ class User:
 
     @property
     def hashed_password(self) -> bytes:
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         return bcrypt.hashpw(self.password, salt)
 
 
@@ -28,6 +32,8 @@ if __name__ == "__main__":
     logger.info("Starting create-user-db job")
 
     con = sqlite3.connect("user.db")
+    # the app only reads, WAL keeps its long-lived connections from blocking this writer
+    con.execute("PRAGMA journal_mode=WAL")
     cur = con.cursor()
 
     res = cur.execute("SELECT name FROM sqlite_master")
@@ -38,7 +44,10 @@ if __name__ == "__main__":
         con.commit()
 
     logger.info("Creating the user table")
-    cur.execute("CREATE TABLE user(username,hashed_password)")
+    # username as primary key of a WITHOUT ROWID table makes it the b-tree key for login lookups
+    cur.execute(
+        "CREATE TABLE user(username TEXT PRIMARY KEY, hashed_password BLOB NOT NULL) WITHOUT ROWID"
+    )
 
     password_og = input("OG's password: ")
 
@@ -50,39 +50,46 @@ Example json to load with def setup_logging:
 }
 """
 
+import atexit
+import copy
 import datetime as dt
 import json
 import logging
 import logging.config
 import logging.handlers
+import threading
 from pathlib import Path
 from typing import override
 
-LOG_RECORD_BUILTIN_ATTRS = {
-    "args",
-    "asctime",
-    "created",
-    "exc_info",
-    "exc_text",
-    "filename",
-    "funcName",
-    "levelname",
-    "levelno",
-    "lineno",
-    "module",
-    "msecs",
-    "message",
-    "msg",
-    "name",
-    "pathname",
-    "process",
-    "processName",
-    "relativeCreated",
-    "stack_info",
-    "thread",
-    "threadName",
-    "taskName",
-}
+import orjson
+
+LOG_RECORD_BUILTIN_ATTRS = frozenset(
+    {
+        "args",
+        "asctime",
+        "created",
+        "exc_info",
+        "exc_text",
+        "filename",
+        "funcName",
+        "levelname",
+        "levelno",
+        "lineno",
+        "module",
+        "msecs",
+        "message",
+        "msg",
+        "name",
+        "pathname",
+        "process",
+        "processName",
+        "relativeCreated",
+        "stack_info",
+        "thread",
+        "threadName",
+        "taskName",
+    }
+)
 
 
 class JSONFormatter(logging.Formatter):
@@ -93,18 +100,19 @@ class JSONFormatter(logging.Formatter):
     ):
         super().__init__()
         self.fmt_keys = fmt_keys if fmt_keys is not None else {}
+        self._fmt_pairs = tuple(self.fmt_keys.items())
+        self._mapped_vals = frozenset(self.fmt_keys.values())
 
     @override
     def format(self, record: logging.LogRecord) -> str:
         message = self._prepare_log_dict(record)
-        return json.dumps(message, default=str)
+        return orjson.dumps(message, default=str).decode()
 
     def _prepare_log_dict(self, record: logging.LogRecord):
+        # orjson serializes the datetime itself, same isoformat as before
         always_fields = {
             "message": record.getMessage(),
-            "timestamp": dt.datetime.fromtimestamp(
-                record.created, tz=dt.timezone.utc
-            ).isoformat(),
+            "timestamp": dt.datetime.fromtimestamp(record.created, tz=dt.timezone.utc),
         }
         if record.exc_info is not None:
             always_fields["exc_info"] = self.formatException(record.exc_info)
@@ -112,13 +120,14 @@ class JSONFormatter(logging.Formatter):
         if record.stack_info is not None:
             always_fields["stack_info"] = self.formatStack(record.stack_info)
 
-        message = {
-            key: msg_val
-            if (msg_val := always_fields.pop(val, None)) is not None
-            else getattr(record, val)
-            for key, val in self.fmt_keys.items()
-        }
-        message.update(always_fields)
+        message = {}
+        for key, val in self._fmt_pairs:
+            msg_val = always_fields.get(val)
+            message[key] = msg_val if msg_val is not None else getattr(record, val)
+
+        for key, val in always_fields.items():
+            if key not in self._mapped_vals:
+                message[key] = val
 
         for key, val in record.__dict__.items():
             if key not in LOG_RECORD_BUILTIN_ATTRS:
@@ -150,8 +159,65 @@ class DependencyFilter(logging.Filter):
             return True
 
 
+class PassThroughQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler leaving the formatting to the handlers behind the listener.
+
+    The stock `prepare` formats the record and drops `exc_info`, so e.g. a RichHandler
+    behind the queue could no longer render tracebacks itself.
+    """
+
+    @override
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # merge args now, they may be mutated before the listener thread gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_queue_listener: logging.handlers.QueueListener | None = None
+_config_file: Path | None = None
+# streamlit runs every session in its own thread, guards the two globals above
+_setup_lock = threading.Lock()
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def stop_queue_listener():
+    global _config_file
+    with _setup_lock:
+        _stop_queue_listener()
+        _config_file = None
+
+
 def setup_logging(config_file: Path):
-    with config_file.open("r") as f:
-        config = json.load(f)
+    global _queue_listener, _config_file
+    with _setup_lock:
+        # streamlit reruns call this repeatedly, configure once per process and file
+        if _config_file == config_file:
+            return
+
+        with config_file.open("r") as f:
+            config = json.load(f)
+
+        # drain the previous listener first
+        _stop_queue_listener()
+
+        logging.config.dictConfig(config)
+        _config_file = config_file
+
+        # formatting and writing of records happens on the listener's thread
+        queue_handler = logging.getHandlerByName("queue_handler")
+        if isinstance(queue_handler, logging.handlers.QueueHandler):
+            listener = queue_handler.listener
+            if listener is not None:
+                listener.start()
+                _queue_listener = listener
+
 
-    logging.config.dictConfig(config)
+atexit.register(stop_queue_listener)
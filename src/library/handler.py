@@ -1,4 +1,6 @@
+import io
 import logging
+from functools import cached_property
 from pathlib import Path
 
 import polars as pl
@@ -16,7 +18,6 @@ logger = logging.getLogger(__name__)
 class ImageHandler(BaseModel):
     # type hinting https://stackoverflow.com/questions/33533148/how-do-i-type-hint-a-method-with-the-type-of-the-enclosing-class
     target_directory: Path
-    original_image: Image.Image
     original_image_bytes: bytes
     original_file_name: str
     target_file_names: StoredFileNames = StoredFileNames()
@@ -24,7 +25,9 @@ class ImageHandler(BaseModel):
     cropped: bool = False
     rotated: bool = False
     angle: float = 0.0
+    crop_box: tuple[int, int, int, int] | None = None  # left, top, width, height
     edited_image: Image.Image | None = None
+    save_json: bool = False
 
     class Config:
         arbitrary_types_allowed = True
@@ -33,20 +36,24 @@ class ImageHandler(BaseModel):
     def original_image_base64(self) -> str:
         return utils.base64_encode_image_bytes(self.original_image_bytes)
 
-    @property
-    def edited_image_base64(self) -> str:
-        edited_image_path = self.get_target_file_path("edited_image")
-        return utils.read_and_b64_encode_image(edited_image_path)
+    @cached_property
+    def original_image(self) -> Image.Image:
+        # only opened once something needs the pixels, e.g. not on re-uploads
+        return Image.open(io.BytesIO(self.original_image_bytes))
+
+    @cached_property
+    def _path_map(self) -> dict[str, Path]:
+        # target_directory and target_file_names are fixed after construction
+        names = self.target_file_names.model_dump()
+        return {k: self.target_directory / v for k, v in names.items()}
 
     def get_target_file_path(self, name: str) -> Path:
-        is_missing = not hasattr(self.target_file_names, name)
-        if is_missing:
+        try:
+            return self._path_map[name]
+        except KeyError:
             msg = f"Failed to find target path for {name=}, known file names: {self.target_file_names.model_dump_json()}"
             logger.error(msg)
-            raise ValueError(msg)
-
-        target_file_path = self.target_directory / getattr(self.target_file_names, name)
-        return target_file_path
+            raise ValueError(msg) from None
 
     def save(self, mkdir: bool, overwrite: bool):
         self.save_images(mkdir, overwrite)
@@ -60,7 +67,15 @@ class ImageHandler(BaseModel):
 
     def save_original_image(self, mkdir: bool, overwrite: bool):
         image_path = self.get_target_file_path("original_image")
-        save_image(self.original_image, "original_image", image_path, overwrite, mkdir)
+        if image_path.exists() and not overwrite:
+            # content addressed by hash, so the stored file is already identical
+            logger.debug(f"Original image already stored at {image_path}")
+            return
+
+        # jpeg uploads are stored as is, skipping a decode/encode round trip
+        is_jpeg = self.original_image.format in ("JPEG", "MPO")
+        image = self.original_image_bytes if is_jpeg else self.original_image
+        save_image(image, "original_image", image_path, overwrite, mkdir)
 
     def save_edited_image(self, mkdir: bool, overwrite: bool):
         image_path = self.get_target_file_path("edited_image")
@@ -88,7 +103,9 @@ class ImageHandler(BaseModel):
         json_path = self.get_target_file_path("shop_info_json")
         parquet_path = self.get_target_file_path("shop_info_parquet")
 
-        save_dataframe(shop, "shop", json_path, parquet_path, overwrite)
+        save_dataframe(
+            shop, "shop", json_path, parquet_path, overwrite, save_json=self.save_json
+        )
 
     def save_items_info(self, overwrite: bool):
         logger.debug("Saving items info")
@@ -101,29 +118,47 @@ class ImageHandler(BaseModel):
         json_path = self.get_target_file_path("items_info_json")
         parquet_path = self.get_target_file_path("items_info_parquet")
 
-        save_dataframe(items, "items", json_path, parquet_path, overwrite)
+        save_dataframe(
+            items, "items", json_path, parquet_path, overwrite, save_json=self.save_json
+        )
 
 
 def save_dataframe(
-    df: pl.DataFrame, name: str, json_path: Path, parquet_path: Path, overwrite: bool
+    df: pl.DataFrame,
+    name: str,
+    json_path: Path,
+    parquet_path: Path,
+    overwrite: bool,
+    save_json: bool = False,
 ):
     logger.debug("Writing dataframe to disk")
 
+    # the json files are only for human inspection, nothing reads them back
     is_missing = not json_path.exists()
-    if is_missing or overwrite:
+    if save_json and (is_missing or overwrite):
         logger.debug(f"Writing {name} info to {json_path}")
         df.write_json(json_path)
 
     is_missing = not parquet_path.exists()
     if is_missing or overwrite:
         logger.debug(f"Writing {name} info to {parquet_path}")
-        df.write_parquet(parquet_path)
+        # per-receipt frames are tiny: one row group, no column statistics in the footer
+        df.write_parquet(
+            parquet_path,
+            compression="zstd",
+            statistics=False,
+            row_group_size=max(df.height, 1),
+        )
 
     logger.debug("Done writing")
 
 
 def save_image(
-    image: Image.Image, name: str, image_path: Path, overwrite: bool, mkdir: bool
+    image: Image.Image | bytes,
+    name: str,
+    image_path: Path,
+    overwrite: bool,
+    mkdir: bool,
 ):
     if image is not None:
         logger.debug(f"Saving {name} at {image_path}")
@@ -137,9 +172,7 @@ def save_image(
 def from_source_image_path(image_path: Path, settings: Settings) -> ImageHandler:
     logger.debug("Creating ImageHandler from an image path")
     logger.debug(f"Reading image from {image_path=}")
-    image = Image.open(image_path)
-    with image_path.open("rb") as f:
-        image_bytes = f.read()
+    image_bytes = image_path.read_bytes()
 
     image_hash = utils.get_image_hash(image_bytes)
     target_directory = utils.get_image_dir_name(settings, image_hash, image_path.name)
@@ -147,13 +180,15 @@ def from_source_image_path(image_path: Path, settings: Settings) -> ImageHandler
     logger.debug("Creating instance of ImageHandler")
     return ImageHandler(
         target_directory=target_directory,
-        original_image=image,
         original_image_bytes=image_bytes,
         original_file_name=image_path.name,
+        save_json=settings.data.save_json,
     )
 
 
-def from_target_directory(target_directory: Path) -> ImageHandler:
+def from_target_directory(
+    target_directory: Path, save_json: bool = False
+) -> ImageHandler:
     logger.debug("Creating ImageHandler from a target directory")
     logger.debug(f"Reading data from {target_directory=}")
 
@@ -163,17 +198,15 @@ def from_target_directory(target_directory: Path) -> ImageHandler:
 
     # original image
     image_path = target_directory / file_names.original_image
-    image = Image.open(image_path)
-    with image_path.open("rb") as f:
-        image_bytes = f.read()
+    image_bytes = image_path.read_bytes()
 
     logger.debug("Creating instance of ImageHandler")
     handler = ImageHandler(
         target_directory=target_directory,
-        original_image=image,
         original_image_bytes=image_bytes,
         original_file_name=image_path.name,
         target_file_names=file_names,
+        save_json=save_json,
     )
 
     # edited image
@@ -225,15 +258,15 @@ def from_streamlit_uploaded_file(
         logger.debug(
             "Target directory already exists for the passed file. Loading pre-existing directory."
         )
-        return from_target_directory(target_directory)
-
-    original_image = Image.open(uploaded_file)
+        return from_target_directory(
+            target_directory, save_json=settings.data.save_json
+        )
 
     logger.debug("Creating handler for new file.")
 
     return ImageHandler(
         target_directory=target_directory,
-        original_image=original_image,
         original_image_bytes=image_bytes,
         original_file_name=original_file_name,
+        save_json=settings.data.save_json,
     )
@@ -1,3 +1,8 @@
+import hashlib
+import json
+
+import polars as pl
+
 NAME_MAP = {
     "BIOD BANANEN": "BIO BANANEN",
     "BIOD Paprika Mix": "BIO Paprika Mix",
@@ -5,4 +10,14 @@ NAME_MAP = {
 
 
 def assign_normalized_name(raw_name: str) -> str:
+    """Deprecated: use `normalize_names_col` on whole columns instead."""
     return NAME_MAP.get(raw_name, raw_name)
+
+
+def normalize_names_col(names: pl.Series) -> pl.Series:
+    return names.replace(NAME_MAP)
+
+
+def get_name_map_fingerprint() -> str:
+    # changes with NAME_MAP, names normalized with an older map are stale
+    return hashlib.sha256(json.dumps(NAME_MAP, sort_keys=True).encode()).hexdigest()
@@ -5,6 +5,11 @@ from enum import Enum
 import polars as pl
 from pydantic import BaseModel, Field
 
+# (format, separator) pairs: YYYY-MM-DD and DD.MM.YYYY
+DATE_FORMATS = (("%Y-%m-%d", "-"), ("%d.%m.%Y", "."))
+# keyed by the number of colons: HH:MM and HH:MM:SS
+TIME_FORMATS = {1: "%H:%M", 2: "%H:%M:%S"}
+
 
 class Shop(BaseModel):
     name: str = Field(
@@ -24,43 +29,26 @@ class Shop(BaseModel):
 
     @property
     def date(self) -> T.Optional[datetime.date]:
-        # case YYYY-MM-DD
-        try:
-            date = datetime.datetime.strptime(self.date_str, "%Y-%m-%d")
-        except ValueError:
-            pass
-        else:
-            return date.date()
-
-        # case DD.MM.YYYY
-        try:
-            date = datetime.datetime.strptime(self.date_str, "%d.%m.%Y")
-        except ValueError:
-            pass
-        else:
-            return date.date()
+        # only formats whose separator occurs in the string are tried
+        for fmt, sep in DATE_FORMATS:
+            if sep not in self.date_str:
+                continue
+            try:
+                return datetime.datetime.strptime(self.date_str, fmt).date()
+            except ValueError:
+                pass
 
         return None
 
     @property
     def time(self) -> T.Optional[datetime.time]:
-        # case HH:MM
+        fmt = TIME_FORMATS.get(self.time_str.count(":"))
+        if fmt is None:
+            return None
         try:
-            time = datetime.datetime.strptime(self.time_str, "%H:%M")
+            return datetime.datetime.strptime(self.time_str, fmt).time()
         except ValueError:
-            pass
-        else:
-            return time.time()
-
-        # case HH:MM:SS
-        try:
-            time = datetime.datetime.strptime(self.time_str, "%H:%M:%S")
-        except ValueError:
-            pass
-        else:
-            return time.time()
-
-        return None
+            return None
 
 
 class CategoryEnum(str, Enum):
@@ -151,13 +139,16 @@ def convert_to_dataframe_shop(
     return shop
 
 
+# dictionary encoded, a small integer code per row instead of the category string
+CATEGORY_DTYPE = pl.Enum([c.value for c in CategoryEnum])
+
 POLARS_ITEM_SCHEMA = {
     "name": pl.String,
     "price": pl.Float64,
     "count": pl.Int64,
     "mass": pl.Float64,
     "tax": pl.String,
-    "category": pl.String,
+    "category": CATEGORY_DTYPE,
 }
 
 
@@ -167,14 +158,26 @@ def convert_to_dataframe_items(
     if polars_item_schema is None:
         polars_item_schema = POLARS_ITEM_SCHEMA
 
-    return pl.from_dicts(
-        data=[item.model_dump() for item in receipt.items], schema=polars_item_schema
-    )
+    # columns straight from the validated attributes, no per-item model_dump
+    items = receipt.items
+    columns = {
+        name: [getattr(item, name) for item in items] for name in polars_item_schema
+    }
+    if "category" in columns:
+        columns["category"] = [
+            None if c is None else c.value for c in columns["category"]
+        ]
+
+    return pl.from_dict(columns, schema=polars_item_schema)
 
 
 def polars_info_dataframes_to_pydantic(
     shop: pl.DataFrame, items: pl.DataFrame
 ) -> Receipt:
-    shop_dict = shop.to_dicts()[0]
-    items_dict = items.to_dicts()
-    return Receipt(shop=Shop(**shop_dict), items=[Item(**d) for d in items_dict])
+    # validated rather than constructed: category rows come back as plain strings
+    shop_row = shop.row(0, named=True)
+    items_rows = items.iter_rows(named=True)
+    return Receipt(
+        shop=Shop.model_validate(shop_row),
+        items=[Item.model_validate(row) for row in items_rows],
+    )
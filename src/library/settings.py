@@ -1,4 +1,5 @@
 import typing as T
+from functools import cached_property
 from pathlib import Path
 
 from pydantic import BaseModel, field_validator, model_validator
@@ -37,6 +38,7 @@ class Data(BaseModel):
     collation_subdir: str
     use_user: bool
     username: str | None = None
+    save_json: bool = False  # additionally store extracted infos as json for debugging
 
     @field_validator("root_dir")  # "legacy_root_dir"
     @classmethod
@@ -111,15 +113,20 @@ class Services(BaseModel):
     keys: Keys
     anthropic: AnthropicService
 
-    def get_anthropic_key(self) -> str:
-        if self.anthropic.key:
-            return self.anthropic.key
+    # the key file is read once per instance, the client cache asks for the key on every extraction
+    @cached_property
+    def _key_file_anthropic_key(self) -> str:
         path = self.keys.dir / self.anthropic.key_file_name
         with path.open("r") as f:
             key = f.readline()
         key = key.replace("\n", "")
         return key
 
+    def get_anthropic_key(self) -> str:
+        if self.anthropic.key:
+            return self.anthropic.key
+        return self._key_file_anthropic_key
+
     @model_validator(mode="after")
     def check_keys_exist(self) -> T.Self:
         if self.anthropic.key:
@@ -159,23 +166,44 @@ class Settings(BaseSettings):
     ) -> T.Tuple[PydanticBaseSettingsSource, ...]:
         return (init_settings, TomlConfigSettingsSource(settings_cls), env_settings)
 
-    def get_data_root_dir(self) -> Path:
-        root_dir = Path(self.data._root_dir()).resolve().absolute()
-        return root_dir
+    # resolve() stats the filesystem, the resolved paths are computed once per instance
+    @cached_property
+    def _resolved_data_root_dir(self) -> Path:
+        return Path(self.data._root_dir()).resolve().absolute()
 
-    def get_legacy_data_root_dir(self) -> T.Optional[Path]:
+    @cached_property
+    def _resolved_logger_config_path(self) -> Path:
+        return Path(self.logging.config_file).resolve().absolute()
+
+    @cached_property
+    def _resolved_legacy_data_root_dir(self) -> T.Optional[Path]:
         if self.data.legacy_root_dir:
             return Path(self.data.legacy_root_dir).resolve().absolute()
         return None
 
-    def get_extraction_artifacts_dir(self) -> Path:
+    # collect and the extraction dir scan ask for these on every call
+    @cached_property
+    def _extraction_artifacts_dir(self) -> Path:
         return self.data.get_extraction_dir()
 
-    def get_collation_artifacts_dir(self) -> Path:
+    @cached_property
+    def _collation_artifacts_dir(self) -> Path:
         return self.data.get_collation_dir()
 
+    def get_data_root_dir(self) -> Path:
+        return self._resolved_data_root_dir
+
+    def get_legacy_data_root_dir(self) -> T.Optional[Path]:
+        return self._resolved_legacy_data_root_dir
+
+    def get_extraction_artifacts_dir(self) -> Path:
+        return self._extraction_artifacts_dir
+
+    def get_collation_artifacts_dir(self) -> Path:
+        return self._collation_artifacts_dir
+
     def get_logger_config_path(self) -> Path:
-        return Path(self.logging.config_file).resolve().absolute()
+        return self._resolved_logger_config_path
 
 
 class StoredFileNames(BaseModel):
@@ -12,6 +12,7 @@ logger = logging.getLogger(__name__)
 
 VAR_STATE = "app_state"
 VAR_SETTINGS = "settings"
+MAX_CACHED_SETTINGS = 64
 
 
 class States(str, Enum):
@@ -45,10 +46,18 @@ def get_app_state() -> AppState:
         return app_state
 
 
+@st.cache_resource(show_spinner=False, max_entries=MAX_CACHED_SETTINGS)
+def build_settings(username: str) -> Settings:
+    # toml parse and path validation run once per process and user, not per session;
+    # only called after a successful login, bounded so idle users get evicted
+    logger.info(f"Building settings for {username=}")
+    return Settings(**{"data": {"username": username}})  # type: ignore
+
+
 def init_settings(username: str):
     if VAR_SETTINGS not in st.session_state:
         logger.info("Initializing settings")
-        settings = Settings(**{"data": {"username": username}})  # type: ignore
+        settings = build_settings(username)
         st.session_state[VAR_SETTINGS] = settings
         fine_logging.setup_logging(settings.get_logger_config_path())
 
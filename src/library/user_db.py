@@ -1,7 +1,11 @@
 import datetime
+import functools
 import logging
 import os
 import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
 
 import bcrypt
 import psycopg
@@ -10,18 +14,31 @@ from pydantic import BaseModel, field_validator
 logger = logging.getLogger(__name__)
 
 
+SQLITE_USER_PASSWORD_QUERY = "SELECT hashed_password FROM user WHERE username = ?"
+POSTGRESQL_USER_PASSWORD_QUERY = (
+    "SELECT hashed_password FROM app_users WHERE username = %s"
+)
+
+
 def get_sqlite_connection_string(db_name: str | None) -> str:
     if db_name is None:
         db_name = "user.db"
-    connection_string = f"file:{db_name}?mode=ro"
+    # absolute, so the string identifies the db regardless of the working directory
+    connection_string = f"{Path(db_name).absolute().as_uri()}?mode=ro"
     return connection_string
 
 
+@functools.lru_cache(maxsize=4)
+def get_sqlite_connection(connection_string: str) -> sqlite3.Connection:
+    # read-only and reused across logins, sqlite3 keeps the prepared statements per connection
+    logger.debug(f"Opening SQLite connection {connection_string}")
+    return sqlite3.connect(connection_string, uri=True, check_same_thread=False)
+
+
 def check_sqlite_db_present(db_name: str | None = None) -> bool:
     connection_string = get_sqlite_connection_string(db_name)
     try:
-        with sqlite3.connect(connection_string, uri=True) as conn:
-            conn.cursor()  # Attempt to create a cursor
+        get_sqlite_connection(connection_string).cursor()  # Attempt to create a cursor
         return True
     except sqlite3.Error as e:
         logger.debug(f"Failed to connect to SQLite DB: {e}")
@@ -30,17 +47,18 @@ def check_sqlite_db_present(db_name: str | None = None) -> bool:
 
 def get_user_password_in_sqlite_db(username: str, db_name: str | None = None) -> bytes:
     connection_string = get_sqlite_connection_string(db_name)
-    con = sqlite3.connect(connection_string, uri=True)
-    cur = con.cursor()
+    con = get_sqlite_connection(connection_string)
 
-    retrieved_hashed_password = b""
-    for user, hpw in cur.execute("SELECT username, hashed_password FROM user"):
-        if user == username:
-            retrieved_hashed_password = hpw
+    row = con.execute(SQLITE_USER_PASSWORD_QUERY, (username,)).fetchone()
+    if row is None:
+        return b""
 
-    con.close()
+    hpw = row[0]
+    # legacy dbs without column types may hold the hash as text
+    if isinstance(hpw, str):
+        hpw = hpw.encode()
 
-    return retrieved_hashed_password
+    return hpw
 
 
 def get_railway_postgresql_connection_string() -> str | None:
@@ -73,20 +91,20 @@ def get_user_password_in_postgresql_db(username: str) -> bytes:
     if connection_string is None:
         raise ValueError("connection_string is None")
 
-    retrieved_hashed_password = b""
     with psycopg.connect(conninfo=connection_string) as conn:
         # Open a cursor to perform database operations
         with conn.cursor() as cur:
             # Note: contrary to the sqlite db the table here is called app_users because there is already a `user` table in postgres by default...
-            for user, hpw in cur.execute(
-                "SELECT username, hashed_password FROM app_users"
-            ):
-                if not isinstance(hpw, bytes) and isinstance(hpw, str):
-                    hpw = hpw.encode()
-                if user == username:
-                    retrieved_hashed_password = hpw
+            row = cur.execute(POSTGRESQL_USER_PASSWORD_QUERY, (username,)).fetchone()
+
+    if row is None:
+        return b""
 
-    return retrieved_hashed_password
+    hpw = row[0]
+    if isinstance(hpw, str):
+        hpw = hpw.encode()
+
+    return hpw
 
 
 class User(BaseModel):
@@ -105,7 +123,9 @@ RATE_LIMIT_COUNT = 1
 RATE_LIMIT_WINDOW = 60  # seconds
 
 
-class Attempt(BaseModel):
+# plain slotted dataclass, mutated on every login attempt without validation overhead
+@dataclass(slots=True)
+class Attempt:
     count: int
     last_time: datetime.datetime
 
@@ -115,32 +135,34 @@ class RateLimiter:
 
     def __init__(self):
         self.attempts: dict[str, Attempt] = {}
+        # streamlit runs sessions in threads, concurrent logins must not lose increments
+        self._lock = threading.RLock()
 
     def increment(self, username: str):
         now = datetime.datetime.now()
 
-        if username not in self.attempts:
-            self.attempts[username] = Attempt(count=1, last_time=now)
-            return
-
-        attempts = self.attempts[username]
+        with self._lock:
+            if username not in self.attempts:
+                self.attempts[username] = Attempt(count=1, last_time=now)
+                return
 
-        dt = now - attempts.last_time
-        t_threshold = datetime.timedelta(seconds=RATE_LIMIT_WINDOW)
+            attempts = self.attempts[username]
 
-        if dt > t_threshold:
-            attempts.count = 1
-            attempts.last_time = now
-        else:
-            attempts.count += 1
+            dt = now - attempts.last_time
+            t_threshold = datetime.timedelta(seconds=RATE_LIMIT_WINDOW)
 
-        self.attempts[username] = attempts
+            if dt > t_threshold:
+                attempts.count = 1
+                attempts.last_time = now
+            else:
+                attempts.count += 1
 
     def check_limit_exceeded(self, username: str) -> bool:
-        self.increment(username)
+        with self._lock:
+            self.increment(username)
+            count = self.attempts[username].count
 
-        attempts = self.attempts[username]
-        if attempts.count > RATE_LIMIT_COUNT:
+        if count > RATE_LIMIT_COUNT:
             return True  # Rate limit exceeded
         return False
 
@@ -148,18 +170,37 @@ class RateLimiter:
 rate_limiter = RateLimiter()
 
 
+@functools.lru_cache(maxsize=1)
+def _detect_db_backend() -> str | None:
+    if check_sqlite_db_present():
+        logger.debug("Found a sqlite db")
+        return "sqlite"
+    if check_postgresql_db_present():
+        logger.debug("Found a postgresql db")
+        return "postgresql"
+    logger.debug("Found no db")
+    return None
+
+
+def get_db_backend() -> str | None:
+    # the backend only changes on redeploy, so the postgres handshake of the presence check runs once
+    backend = _detect_db_backend()
+    if backend is None:
+        # not cached, a db that is temporarily unreachable is picked up on the next login
+        _detect_db_backend.cache_clear()
+    return backend
+
+
 def check_is_legit_user(user: User) -> bool:
     if rate_limiter.check_limit_exceeded(user.username):
         return False
 
-    if check_sqlite_db_present():
-        logger.debug("Found a sqlite db")
+    backend = get_db_backend()
+    if backend == "sqlite":
         retrieved_hashed_password = get_user_password_in_sqlite_db(user.username)
-    elif check_postgresql_db_present():
-        logger.debug("Found a postgresql db")
+    elif backend == "postgresql":
         retrieved_hashed_password = get_user_password_in_postgresql_db(user.username)
     else:
-        logger.debug("Found no db")
         return False
 
     if retrieved_hashed_password == b"" or retrieved_hashed_password is None:
@@ -1,17 +1,21 @@
-import base64
 import hashlib
+import io
+import json
 import logging
+import os
 import shutil
+import time
 import typing as T
 import zipfile
 from pathlib import Path
 
 import polars as pl
+import pybase64
 import requests
 from PIL import Image
 from xlsxwriter import Workbook
 
-from library.names import assign_normalized_name
+from library.names import get_name_map_fingerprint, normalize_names_col
 from library.settings import Settings, StoredFileNames
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,36 @@ ID_COL = "target_directory"
 SHOP_COLS = [ID_COL, "name", "date", "time", "total"]
 ITEMS_COLS = [ID_COL, "name", "price", "count", "mass", "tax", "category"]
 NORMALIZED_NAME_COL = "pretty name"
+VLM_MAX_IMAGE_EDGE = 1568  # pixels
+JPEG_QUALITY = 75  # pillow's default
+COMPILED_ROW_GROUP_SIZE = 64_000  # rows
+INTERNET_CHECK_TTL = 10.0  # seconds
+# jpegs and parquets are compressed already, deflating them costs cpu for nothing
+ZIP_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".parquet"}
+ZIP_COPY_CHUNK_SIZE = 1 << 20  # bytes
+
+_last_internet_check: T.Tuple[float, bool] | None = None  # (monotonic time, result)
+
+
+def find_files_by_name(
+    root_dir: Path, file_names: T.Iterable[str]
+) -> T.Dict[str, T.List[Path]]:
+    # one scandir pass per dir for all names, files directly in root_dir are skipped;
+    # DirEntry caches the file type so no extra stat calls are needed
+    found: T.Dict[str, T.List[Path]] = {name: [] for name in file_names}
+    try:
+        with os.scandir(root_dir) as it:
+            pending = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return found  # like os.walk, a missing root_dir yields nothing
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name in found:
+                    found[entry.name].append(Path(entry.path))
+    return found
 
 
 def check_available_extraction_dirs(
@@ -28,41 +62,59 @@ def check_available_extraction_dirs(
     root_dir = settings.get_extraction_artifacts_dir()
     file_names = StoredFileNames()
 
+    found = find_files_by_name(
+        root_dir, [file_names.shop_info_parquet, file_names.items_info_parquet]
+    )
+
     # shop info
-    shop_info_files = root_dir.rglob(f"**/{file_names.shop_info_parquet}")
-    shop_info_files = [f for f in shop_info_files if f.parent != root_dir]
+    shop_info_files = found[file_names.shop_info_parquet]
     logger.debug(f"Detected {len(shop_info_files):_} shop info files")
 
     # items info
-    items_info_files = list(root_dir.rglob(f"**/{file_names.items_info_parquet}"))
-    items_info_files = [f for f in items_info_files if f.parent != root_dir]
+    items_info_files = found[file_names.items_info_parquet]
     logger.debug(f"Detected {len(items_info_files):_} items info files")
 
     return shop_info_files, items_info_files
 
 
-def compile_infos(info_files: T.List[Path]) -> pl.DataFrame:
+def scan_infos(info_files: T.List[Path]) -> pl.LazyFrame:
     if len(info_files) == 0:
         raise ValueError(f"{len(info_files)=} is zero, expected at least one element.")
-    compiled_info = []
-    for info_file in info_files:
-        info = pl.read_parquet(info_file)
-        info = info.with_columns(pl.lit(info_file.parent.name).alias(ID_COL))
-        compiled_info.append(info)
+    scanned_info = [
+        pl.scan_parquet(info_file).with_columns(
+            pl.lit(info_file.parent.name).alias(ID_COL)
+        )
+        for info_file in info_files
+    ]
 
-    compiled_info = pl.concat(compiled_info, how="diagonal")
-    return compiled_info
+    # relaxed, receipts stored before the category enum hold it as a string column
+    return pl.concat(scanned_info, how="diagonal_relaxed")
+
+
+def compile_infos(info_files: T.List[Path]) -> pl.DataFrame:
+    return scan_infos(info_files).collect()
 
 
 def internet_connection():
+    # streamlit reruns call this repeatedly, a recent answer saves the http round trip
+    global _last_internet_check
+    now = time.monotonic()
+    if (
+        _last_internet_check is not None
+        and now - _last_internet_check[0] < INTERNET_CHECK_TTL
+    ):
+        return _last_internet_check[1]
+
     try:
         res = requests.get("https://status.anthropic.com/", timeout=5)
         success = res.status_code == 200
         logger.info(f"anthropic.com {res.status_code=}")
-        return success
     except requests.RequestException as e:
         logger.info(f"anthropic.com is unavailable: {str(e)}")
-        return False
+        success = False
+
+    _last_internet_check = (now, success)
+    return success
 
 
 def get_compiled_paths(settings: Settings):
@@ -73,40 +125,116 @@ def get_compiled_paths(settings: Settings):
     return compiled_shop_info_path, compiled_items_info_path
 
 
+def get_manifest_path(compiled_path: Path) -> Path:
+    return compiled_path.with_suffix(".manifest.json")
+
+
+def read_manifest(compiled_path: Path) -> dict:
+    manifest_path = get_manifest_path(compiled_path)
+    if not compiled_path.exists() or not manifest_path.exists():
+        return {}
+    return json.loads(manifest_path.read_text())
+
+
+def write_manifest(compiled_path: Path, manifest: dict):
+    get_manifest_path(compiled_path).write_text(json.dumps(manifest))
+
+
+def update_compiled_infos(
+    info_files: T.List[Path],
+    compiled_path: Path,
+    cols: T.List[str],
+    derived: str | None = None,
+) -> T.Tuple[pl.DataFrame | None, dict]:
+    # the manifest records (mtime, size) of every source file of the last compilation,
+    # so only added / changed receipts are read again. Returns None if nothing changed.
+    # `derived` fingerprints how derived columns are computed, a change rebuilds all.
+    if len(info_files) == 0:
+        raise ValueError(f"{len(info_files)=} is zero, expected at least one element.")
+
+    files = {}
+    for info_file in info_files:
+        stat = info_file.stat()
+        files[str(info_file)] = [stat.st_mtime_ns, stat.st_size]
+    manifest = {"cols": cols, "derived": derived, "files": files}
+
+    previous = read_manifest(compiled_path)
+    is_compatible = previous.get("cols") == cols and previous.get("derived") == derived
+    previous_files = previous.get("files", {}) if is_compatible else {}
+
+    changed = [f for f in info_files if previous_files.get(str(f)) != files[str(f)]]
+    removed = [Path(f) for f in previous_files if f not in files]
+    if len(changed) == 0 and len(removed) == 0:
+        return None, manifest
+
+    logger.debug(f"Reading {len(changed):_} changed files, dropping {len(removed):_}")
+    stale_ids = [f.parent.name for f in changed + removed]
+    compiled_info = []
+    if len(previous_files) > 0:
+        compiled_info.append(
+            pl.scan_parquet(compiled_path)
+            .select(cols)
+            .filter(~pl.col(ID_COL).is_in(stale_ids))
+        )
+    if len(changed) > 0:
+        # selecting before collecting lets polars skip decoding unused columns
+        compiled_info.append(scan_infos(changed).select(cols))
+
+    return pl.concat(compiled_info, how="diagonal_relaxed").collect(), manifest
+
+
+def write_compiled_info(compiled_info: pl.DataFrame, compiled_path: Path):
+    # lz4 is cheap to decode and several row groups let the excel export and the
+    # next incremental collection decode in parallel and skip groups by statistics
+    compiled_info.write_parquet(
+        compiled_path,
+        compression="lz4",
+        statistics=True,
+        row_group_size=COMPILED_ROW_GROUP_SIZE,
+    )
+
+
 def collect(settings: Settings):
     compiled_shop_info_path, compiled_items_info_path = get_compiled_paths(settings)
     shop_info_files, items_info_files = check_available_extraction_dirs(settings)
 
     logger.info("Compiling shop info")
-    compiled_shop_info = compile_infos(shop_info_files)
-    logger.info(
-        f"Compiled shop info for {compiled_shop_info[ID_COL].n_unique():_} receipts, totalling {len(compiled_shop_info):_} lines."
+    compiled_shop_info, shop_manifest = update_compiled_infos(
+        shop_info_files, compiled_shop_info_path, SHOP_COLS
     )
+    if compiled_shop_info is None:
+        logger.info("Shop info unchanged since the last collection")
+    else:
+        logger.info(
+            f"Compiled shop info for {compiled_shop_info[ID_COL].n_unique():_} receipts, totalling {len(compiled_shop_info):_} lines."
+        )
 
-    logger.info("Compiling items info")
-    compiled_items_info = compile_infos(items_info_files)
-    logger.info(
-        f"Compiled items info for {compiled_items_info[ID_COL].n_unique():_} receipts, totalling {len(compiled_items_info):_} lines."
-    )
-
-    compiled_shop_info = compiled_shop_info[SHOP_COLS]
-
-    compiled_items_info = compiled_items_info[ITEMS_COLS]
+        logger.debug(f"Writing compiled shop info to {compiled_shop_info_path}")
+        write_compiled_info(compiled_shop_info, compiled_shop_info_path)
+        write_manifest(compiled_shop_info_path, shop_manifest)
 
-    logger.debug(f"Assigning {NORMALIZED_NAME_COL}")
-    compiled_items_info = compiled_items_info.with_columns(
-        **{
-            NORMALIZED_NAME_COL: pl.col("name").map_elements(
-                assign_normalized_name, return_dtype=pl.Utf8
-            )
-        }
+    logger.info("Compiling items info")
+    compiled_items_info, items_manifest = update_compiled_infos(
+        items_info_files,
+        compiled_items_info_path,
+        ITEMS_COLS,
+        derived=f"{NORMALIZED_NAME_COL}:{get_name_map_fingerprint()}",
     )
+    if compiled_items_info is None:
+        logger.info("Items info unchanged since the last collection")
+    else:
+        logger.info(
+            f"Compiled items info for {compiled_items_info[ID_COL].n_unique():_} receipts, totalling {len(compiled_items_info):_} lines."
+        )
 
-    logger.debug(f"Writing compiled shop info to {compiled_shop_info_path}")
-    compiled_shop_info.write_parquet(compiled_shop_info_path)
+        logger.debug(f"Assigning {NORMALIZED_NAME_COL}")
+        compiled_items_info = compiled_items_info.with_columns(
+            normalize_names_col(compiled_items_info["name"]).alias(NORMALIZED_NAME_COL)
+        )
 
-    logger.debug(f"Writing compiled items info to {compiled_items_info_path}")
-    compiled_items_info.write_parquet(compiled_items_info_path)
+        logger.debug(f"Writing compiled items info to {compiled_items_info_path}")
+        write_compiled_info(compiled_items_info, compiled_items_info_path)
+        write_manifest(compiled_items_info_path, items_manifest)
 
     logger.info("Done collecting")
 
@@ -119,32 +247,78 @@ def create_zipfile(root_dir_extraction: Path) -> Path:
     path_archive = root_dir_extraction.parent / "extractions.zip"
     logger.debug(f"Creating {path_archive=}")
 
+    write_zipfile(path_archive, root_dir_extraction)
+
+    logger.debug(f"{path_archive.exists()=}, {path_archive.is_file()=}")
+    return path_archive
+
+
+def create_zipfile_bytes(root_dir_extraction: Path) -> bytes:
+    if not root_dir_extraction.exists():
+        raise FileNotFoundError(
+            f"{root_dir_extraction=} does not exist, stopping creation of zipfile."
+        )
+    logger.debug(f"Creating in-memory zip archive of {root_dir_extraction=}")
+
+    # writing straight into memory avoids writing the archive to disk only to read it back
+    buffer = io.BytesIO()
+    write_zipfile(buffer, root_dir_extraction)
+
+    return buffer.getvalue()
+
+
+def write_zipfile(target: Path | T.BinaryIO, root_dir_extraction: Path):
     with zipfile.ZipFile(
-        path_archive, mode="w", compression=zipfile.ZIP_DEFLATED
+        target, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1
     ) as archive:
         for file_path in root_dir_extraction.rglob("*"):
-            archive.write(file_path, arcname=file_path.relative_to(root_dir_extraction))
+            arcname = file_path.relative_to(root_dir_extraction)
+            compress_type = get_zip_compress_type(file_path)
+            if compress_type == zipfile.ZIP_STORED:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname=arcname)
+                if not zinfo.is_dir():
+                    # no compressor involved, copy in larger chunks than ZipFile.write
+                    zinfo.compress_type = compress_type
+                    with file_path.open("rb") as src, archive.open(zinfo, "w") as dst:
+                        shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK_SIZE)
+                    continue
+            archive.write(file_path, arcname=arcname, compress_type=compress_type)
 
-    logger.debug(f"{path_archive.exists()=}, {path_archive.is_file()=}")
-    return path_archive
+
+def get_zip_compress_type(file_path: Path) -> int:
+    if file_path.suffix.lower() in ZIP_STORED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
 
 
 def put_id_col_at_end(df: pl.DataFrame, id_col: str) -> pl.DataFrame:
+    if df.columns[-1] == id_col:
+        return df
+    # selecting by name only reorders the column references, no data is copied
     new_cols = [c for c in df.columns if c != id_col] + [id_col]
     return df.select(new_cols)
 
 
-def write_excel_workbook(settings: Settings) -> Path:
+def write_excel_workbook(
+    settings: Settings,
+    shops: pl.DataFrame | None = None,
+    items: pl.DataFrame | None = None,
+) -> Path:
     root_dir_extraction = settings.get_extraction_artifacts_dir().absolute()
     compiled_shop_info_path, compiled_items_info_path = get_compiled_paths(settings)
     path_excel = root_dir_extraction.parent / "groceries-data.xlsx"
     logger.debug(f"Creating {path_excel=}")
 
-    shops = pl.read_parquet(compiled_shop_info_path)
-    items = pl.read_parquet(compiled_items_info_path)
+    # callers that already hold the compiled frames can skip re-reading the parquets
+    if shops is None:
+        shops = pl.read_parquet(compiled_shop_info_path)
+    if items is None:
+        items = pl.read_parquet(compiled_items_info_path)
 
     # https://docs.pola.rs/api/python/stable/reference/api/polars.DataFrame.write_excel.html
-    with Workbook(path_excel) as wb:
+    # constant_memory would drop the tables and autofit, in_memory skips xlsxwriter's
+    # per-sheet temp files; the workbooks are small enough for that
+    with Workbook(path_excel, {"in_memory": True}) as wb:
         shops = put_id_col_at_end(shops, ID_COL)
         shops.write_excel(
             workbook=wb,
@@ -189,11 +363,9 @@ def cleanup(settings: Settings):
 
 
 def read_image_as_bytes(image_path: Path) -> bytes:
-    if image_path.exists() and image_path.is_file():
-        with image_path.open("rb") as image_file:
-            image_bytes = image_file.read()
-
-        return image_bytes
+    if image_path.is_file():
+        # read_bytes sizes the buffer from fstat and fills it in one read
+        return image_path.read_bytes()
 
     msg = f"Image file not found at {image_path}"
     logger.error(msg)
@@ -202,18 +374,35 @@ def read_image_as_bytes(image_path: Path) -> bytes:
 
 def base64_encode_image_bytes(image_bytes: bytes) -> str:
     if isinstance(image_bytes, bytes):
-        return base64.b64encode(image_bytes).decode("utf-8")
+        # simd accelerated, byte identical to the stdlib base64 output
+        return pybase64.b64encode_as_string(image_bytes)
     raise TypeError(f"{image_bytes=} is not of type bytes but {type(image_bytes)=}.")
 
 
-def read_and_b64_encode_image(image_path: Path) -> str:
-    image_bytes = read_image_as_bytes(image_path)
-    base64_enc = base64_encode_image_bytes(image_bytes)
-    return base64_enc
-
-
-def get_image_hash(image_bytes: bytes) -> str:
-    hash_object = hashlib.sha256(image_bytes)
+def prepare_vlm_image(
+    image: Image.Image, max_edge: int = VLM_MAX_IMAGE_EDGE, quality: int = 85
+) -> bytes:
+    # anthropic downsizes larger images anyway, sending them only costs upload time
+    # https://docs.anthropic.com/en/docs/build-with-claude/vision#evaluate-image-size
+    image = image.copy()
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def get_image_hash(image: bytes | T.BinaryIO | Path) -> str:
+    # files and file objects are streamed through hashlib's buffered digest loop
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        hash_object = hashlib.sha256(image)
+    elif isinstance(image, Path):
+        with image.open("rb") as f:
+            hash_object = hashlib.file_digest(f, "sha256")
+    else:
+        hash_object = hashlib.file_digest(image, "sha256")
     return hash_object.hexdigest()
 
 
@@ -226,7 +415,11 @@ def get_image_dir_name(
 
 
 def save_image_as_jpg_file(
-    image_path: Path, image: bytes | Image.Image, overwrite: bool, mkdir: bool
+    image_path: Path,
+    image: bytes | Image.Image,
+    overwrite: bool,
+    mkdir: bool,
+    quality: int = JPEG_QUALITY,
 ):
     image_dir = image_path.parent
 
@@ -254,7 +447,16 @@ def save_image_as_jpg_file(
             f.write(image)
 
     elif is_pil:
-        image.save(image_path)  # type: ignore
+        # encoder settings spelled out, they match pillow's defaults: baseline
+        # huffman tables, no progressive scan, 4:2:0 subsampling
+        image.save(  # type: ignore
+            image_path,
+            format="JPEG",
+            quality=quality,
+            optimize=False,
+            progressive=False,
+            subsampling=2,
+        )
 
     else:
         msg = f"Image is neither bytes nor PIL Image, but {type(image)}."
@@ -1,6 +1,7 @@
 import logging
 
 import instructor
+import streamlit as st
 from anthropic import Anthropic
 from instructor import Instructor
 
@@ -10,6 +11,11 @@ from library.settings import Services
 logger = logging.getLogger(__name__)
 
 
+# the client holds the http connection pool, reusing it across reruns and sessions saves the tls handshake
+# hashing only the api key avoids hashing the whole settings model
+@st.cache_resource(
+    show_spinner=False, hash_funcs={Services: lambda s: s.get_anthropic_key()}
+)
 def get_anthropic_client(services: Services) -> Instructor:
     api_key = services.get_anthropic_key()
     client = Anthropic(api_key=api_key)
@@ -0,0 +1,58 @@
+import base64
+import functools
+import os
+import typing as T
+from pathlib import Path
+
+import bcrypt
+import pytest
+
+TEST_PASSWORDS = (b"testpassword", b"wuppety", b"wup")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]):
+    # tests calling external apis are opt-in, via `-m network` or RUN_NETWORK_TESTS=1
+    if "network" in (config.option.markexpr or "") or os.environ.get(
+        "RUN_NETWORK_TESTS"
+    ):
+        return
+    skip_network = pytest.mark.skip(
+        reason="needs network, run with -m network or RUN_NETWORK_TESTS=1"
+    )
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip_network)
+
+
+@pytest.fixture(scope="session")
+def hashed_passwords() -> dict[bytes, bytes]:
+    # hashed once per session at the minimal cost, the tests only check checkpw round trips
+    return {pw: bcrypt.hashpw(pw, bcrypt.gensalt(rounds=4)) for pw in TEST_PASSWORDS}
+
+
+@pytest.fixture(scope="session")
+def checkpw() -> T.Callable[[bytes, bytes], bool]:
+    # verified (password, hash) pairs are remembered, repeated cases skip the bcrypt kdf
+    return functools.lru_cache(maxsize=None)(bcrypt.checkpw)
+
+
+@pytest.fixture(scope="session")
+def static_settings_files(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> tuple[Path, Path]:
+    # logging config and key file are only read, one copy serves the whole session
+    static_dir = tmp_path_factory.mktemp("static-settings")
+    log_config = static_dir / "logging.conf"
+    log_config.touch()
+    key_dir = static_dir / "keys"
+    key_dir.mkdir()
+    key_file = key_dir / "anthropic.key"
+    key_file.write_text("test-key\n")
+    return log_config, key_file
+
+
+@pytest.fixture(scope="session")
+def dummy_png_b64() -> tuple[bytes, str]:
+    # a 1x1 png and its stdlib base64 reference, encoded once per session
+    data = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82"
+    return data, base64.b64encode(data).decode("ascii")
@@ -1,60 +1,48 @@
 import io
-import shutil
 from pathlib import Path
 
 import pytest
+import streamlit.runtime.uploaded_file_manager as st_file
 from PIL import Image
+from streamlit.proto.Common_pb2 import FileURLs
 
 import library.handler as handler
+import library.schemas as schemas
 import library.settings as settings_module
 from library.settings import Settings
 
 
-@pytest.fixture
-def sample_image_bytesio() -> io.BytesIO:
+@pytest.fixture(scope="session")
+def sample_image_bytes() -> bytes:
+    # encoded once per session, tests only need the bytes
     image = Image.new("RGB", (100, 100), color="red")
     byte_io = io.BytesIO()
     image.save(byte_io, format="JPEG")
-    byte_io.seek(0)
-    return byte_io
-
-
-class MockUploadedFile:
-    def __init__(self, name: str, byte_io: io.BytesIO):
-        self.name = name
-        self.byte_io = byte_io
-
-    def getvalue(self) -> bytes:
-        return self.byte_io.getvalue()
-
-    def seek(self, *args, **kwargs) -> int:
-        return self.byte_io.seek(*args, **kwargs)
+    return byte_io.getvalue()
 
-    def read(self, *args) -> bytes:
-        return self.byte_io.read(*args)
 
-    def tell(self) -> int:
-        return self.byte_io.tell()
+@pytest.fixture
+def mock_uploaded_file(sample_image_bytes: bytes) -> st_file.UploadedFile:
+    # streamlit's own UploadedFile is a BytesIO, so no wrapper methods are needed
+    record = st_file.UploadedFileRec(
+        file_id="test-file-id",
+        name="test_image.jpg",
+        type="image/jpeg",
+        data=sample_image_bytes,
+    )
+    return st_file.UploadedFile(record, FileURLs())
 
 
 @pytest.fixture
-def mock_uploaded_file(sample_image_bytesio: io.BytesIO) -> MockUploadedFile:
-    return MockUploadedFile("test_image.jpg", sample_image_bytesio)
-
+def settings(tmp_path: Path, static_settings_files: tuple[Path, Path]) -> Settings:
+    log_config, key_file = static_settings_files
 
-def get_settings(tmp_path: Path) -> Settings:
     root_dir = tmp_path / "root"
     root_dir.mkdir()
     extraction_dir = root_dir / "extraction"
     extraction_dir.mkdir()
     collation_dir = root_dir / "collation"
     collation_dir.mkdir()
-    log_config = tmp_path / "logging.conf"
-    log_config.touch()
-    key_dir = tmp_path / "keys"
-    key_dir.mkdir()
-    key_file = key_dir / "anthropic.key"
-    key_file.write_text("test-key\n")
 
     settings = Settings(
         data=settings_module.Data(
@@ -65,7 +53,7 @@ def get_settings(tmp_path: Path) -> Settings:
         ),
         logging=settings_module.Logging(config_file=log_config),
         services=settings_module.Services(
-            keys=settings_module.Keys(dir=key_dir),
+            keys=settings_module.Keys(dir=key_file.parent),
             anthropic=settings_module.AnthropicService(
                 key_file_name=key_file.name, model="wup", max_tokens=42
             ),
@@ -76,12 +64,10 @@ def get_settings(tmp_path: Path) -> Settings:
 
 
 def test_from_streamlit_uploaded_file_new_directory(
-    mock_uploaded_file: MockUploadedFile, tmp_path: Path
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
 ):
-    settings = get_settings(tmp_path)
-
     # Line to test
-    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)  # type: ignore
+    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
 
     # Conditions
     assert isinstance(result, handler.ImageHandler)
@@ -95,22 +81,18 @@ def test_from_streamlit_uploaded_file_new_directory(
     assert result.original_image_bytes == mock_uploaded_file.getvalue()
     assert result.original_file_name == "test_image.jpg"
 
-    # Clean up
-    shutil.rmtree(settings.data.root_dir)
-
 
 def test_from_streamlit_uploaded_file_existing_directory(
-    mock_uploaded_file: MockUploadedFile, tmp_path: Path
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
 ):
     # Create a directory that will be detected as existing
-    settings = get_settings(tmp_path)
-    result0 = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)  # type: ignore
+    result0 = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
     result0.save(mkdir=True, overwrite=False)
 
     assert result0.target_directory.exists()
 
     # Line to test
-    result1 = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)  # type: ignore
+    result1 = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
 
     # Conditions - loaded data expected
     assert isinstance(result1, handler.ImageHandler)
@@ -136,17 +118,13 @@ def test_from_streamlit_uploaded_file_existing_directory(
     items_parquet_path = result1.get_target_file_path("items_info_parquet")
     assert not items_parquet_path.exists()
 
-    # Clean up
-    shutil.rmtree(settings.data.root_dir)
 
-
-def test_from_source_image_path(mock_uploaded_file: MockUploadedFile, tmp_path: Path):
+def test_from_source_image_path(
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
+):
     # Create a directory with the image to start from
-    settings = get_settings(tmp_path)
-
-    test_image = Image.open(mock_uploaded_file.byte_io)
     test_image_path = settings.data.root_dir / "test_image.jpg"
-    test_image.save(test_image_path)
+    test_image_path.write_bytes(mock_uploaded_file.getvalue())
     assert test_image_path.exists()
 
     # Line to test
@@ -164,5 +142,63 @@ def test_from_source_image_path(mock_uploaded_file: MockUploadedFile, tmp_path:
 
     assert result.original_file_name == "test_image.jpg"
 
-    # Clean up
-    shutil.rmtree(settings.data.root_dir)
+
+@pytest.mark.parametrize("save_json", [False, True])
+def test_save_receipt_info_json_optional(
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings, save_json: bool
+):
+    settings.data.save_json = save_json
+    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
+    result.extracted_receipt_info = schemas.Receipt(
+        shop=schemas.Shop(
+            name="Shop", date_str="2024-10-14", time_str="13:12", total=1.5
+        ),
+        items=[schemas.Item(name="Bread", price=1.5)],
+    )
+
+    # Line to test
+    result.save(mkdir=True, overwrite=False)
+
+    # Conditions
+    assert result.get_target_file_path("shop_info_parquet").exists()
+    assert result.get_target_file_path("items_info_parquet").exists()
+    assert result.get_target_file_path("shop_info_json").exists() is save_json
+    assert result.get_target_file_path("items_info_json").exists() is save_json
+
+
+def test_get_target_file_path_unknown_name(
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
+):
+    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
+
+    assert (
+        result.get_target_file_path("edited_image")
+        == result.target_directory / result.target_file_names.edited_image
+    )
+    with pytest.raises(ValueError):
+        result.get_target_file_path("not_a_file")
+
+
+def test_save_original_image_keeps_jpeg_bytes(
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
+):
+    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
+
+    # Line to test
+    result.save_original_image(mkdir=True, overwrite=False)
+
+    image_path = result.get_target_file_path("original_image")
+    assert image_path.read_bytes() == mock_uploaded_file.getvalue()
+
+
+def test_original_image_opened_lazily(
+    mock_uploaded_file: st_file.UploadedFile, settings: Settings
+):
+    result = handler.from_streamlit_uploaded_file(mock_uploaded_file, settings)
+
+    assert "original_image" not in result.__dict__
+
+    image = result.original_image
+
+    assert image.size == (100, 100)
+    assert result.original_image is image
@@ -1,4 +1,6 @@
-from library.names import NAME_MAP, assign_normalized_name
+import polars as pl
+
+from library.names import NAME_MAP, assign_normalized_name, normalize_names_col
 
 
 def test_assign_normalized_name_existing():
@@ -10,3 +12,10 @@ def test_assign_normalized_name_existing():
     not_contained = "This is definitively not in the map"
     assert not_contained not in NAME_MAP
     assert assign_normalized_name(not_contained) == not_contained
+
+
+def test_normalize_names_col():
+    names = pl.Series("name", ["BIOD BANANEN", "Not in the map", None])
+    result = normalize_names_col(names)
+    assert result.to_list() == ["BIO BANANEN", "Not in the map", None]
+    assert result.name == "name"
@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+
+from library.schemas import (
+    POLARS_ITEM_SCHEMA,
+    CategoryEnum,
+    Item,
+    Receipt,
+    Shop,
+    convert_to_dataframe_items,
+    convert_to_dataframe_shop,
+    polars_info_dataframes_to_pydantic,
+)
+
+
+@pytest.mark.parametrize(
+    "date_str,expected",
+    [
+        ("2021-05-13", datetime.date(2021, 5, 13)),
+        ("13.5.2021", datetime.date(2021, 5, 13)),
+        ("13.05.2021", datetime.date(2021, 5, 13)),
+        ("2021-13-05", None),
+        ("13/05/2021", None),
+        ("", None),
+    ],
+)
+def test_shop_date(date_str: str, expected: datetime.date | None):
+    shop = Shop(name="Shop", date_str=date_str, time_str="16:46", total=1.0)
+    assert shop.date == expected
+
+
+@pytest.mark.parametrize(
+    "time_str,expected",
+    [
+        ("16:46", datetime.time(16, 46)),
+        ("16:46:47", datetime.time(16, 46, 47)),
+        ("25:61", None),
+        ("1646", None),
+        ("16:46:47:00", None),
+    ],
+)
+def test_shop_time(time_str: str, expected: datetime.time | None):
+    shop = Shop(name="Shop", date_str="2021-05-13", time_str=time_str, total=1.0)
+    assert shop.time == expected
+
+
+def test_convert_to_dataframe_items():
+    receipt = Receipt(
+        shop=Shop(name="Shop", date_str="2021-05-13", time_str="16:46", total=3.0),
+        items=[
+            Item(name="Bread", price=1.5, category=CategoryEnum.baked_good),
+            Item(name="Apples", price=1.5, count=None, mass=0.5, tax="A"),
+        ],
+    )
+
+    items = convert_to_dataframe_items(receipt)
+
+    assert items.schema == POLARS_ITEM_SCHEMA
+    assert items.to_dicts() == [
+        {
+            "name": "Bread",
+            "price": 1.5,
+            "count": 1,
+            "mass": None,
+            "tax": None,
+            "category": "Bread and baked goods",
+        },
+        {
+            "name": "Apples",
+            "price": 1.5,
+            "count": None,
+            "mass": 0.5,
+            "tax": "A",
+            "category": None,
+        },
+    ]
+
+
+def test_convert_to_dataframe_items_empty():
+    receipt = Receipt(
+        shop=Shop(name="Shop", date_str="2021-05-13", time_str="16:46", total=0.0),
+        items=[],
+    )
+
+    items = convert_to_dataframe_items(receipt)
+
+    assert items.shape == (0, len(POLARS_ITEM_SCHEMA))
+
+
+def test_polars_info_dataframes_to_pydantic_round_trip():
+    receipt = Receipt(
+        shop=Shop(name="Shop", date_str="2021-05-13", time_str="16:46", total=3.0),
+        items=[
+            Item(name="Bread", price=1.5, category=CategoryEnum.baked_good),
+            Item(name="Apples", price=1.5, count=None, mass=0.5, tax="A"),
+        ],
+    )
+
+    shop = convert_to_dataframe_shop(receipt)
+    items = convert_to_dataframe_items(receipt)
+
+    assert polars_info_dataframes_to_pydantic(shop, items) == receipt
@@ -1,4 +1,7 @@
+import os
+import typing as T
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
@@ -153,6 +156,10 @@ def test_services(tmp_path: Path):
 
     assert services.get_anthropic_key() == "test-key"
 
+    # read once per instance
+    key_file.write_text("other-key\n")
+    assert services.get_anthropic_key() == "test-key"
+
 
 def test_services_missing_key_file(tmp_path: Path):
     key_dir = tmp_path / "keys"
@@ -169,7 +176,8 @@ def test_services_missing_key_file(tmp_path: Path):
 
 
 # ============== Test the class Settings ==============
-def test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+@pytest.fixture
+def settings_tree(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict[str, Path]:
     dummy_dir = tmp_path / "dummy"
     dummy_dir.mkdir()
     monkeypatch.chdir(dummy_dir)
@@ -187,16 +195,26 @@ def test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
     key_file = key_dir / "anthropic.key"
     key_file.write_text("test-key\n")
 
-    settings = Settings(
+    return {
+        "root_dir": root_dir,
+        "extraction_dir": extraction_dir,
+        "collation_dir": collation_dir,
+        "log_config": log_config,
+        "key_dir": key_dir,
+    }
+
+
+def build_settings_from_kwargs(settings_tree: dict[str, Path]) -> Settings:
+    return Settings(
         data=Data(
-            root_dir=root_dir,
+            root_dir=settings_tree["root_dir"],
             extraction_subdir="extraction",
             collation_subdir="collation",
             use_user=False,
         ),
-        logging=Logging(config_file=log_config),
+        logging=Logging(config_file=settings_tree["log_config"]),
         services=Services(
-            keys=Keys(dir=key_dir),
+            keys=Keys(dir=settings_tree["key_dir"]),
             anthropic=AnthropicService(
                 key_file_name="anthropic.key",
                 model="gpt-3",
@@ -205,66 +223,46 @@ def test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
         ),
     )
 
-    assert settings.get_data_root_dir() == root_dir
-    assert settings.get_extraction_artifacts_dir() == extraction_dir
-    assert settings.get_collation_artifacts_dir() == collation_dir
-    assert settings.get_logger_config_path() == log_config
-
 
-@pytest.fixture
-def env_setup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
-    dummy_dir = tmp_path / "dummy"
-    dummy_dir.mkdir()
-    monkeypatch.chdir(dummy_dir)
-
-    root_dir = tmp_path / "root"
-    root_dir.mkdir()
-    extraction_dir = root_dir / "extraction"
-    extraction_dir.mkdir()
-    collation_dir = root_dir / "collation"
-    collation_dir.mkdir()
-    log_config = tmp_path / "logging.conf"
-    log_config.touch()
-    key_dir = tmp_path / "keys"
-    key_dir.mkdir()
-    key_file = key_dir / "anthropic.key"
-    key_file.write_text("test-key\n")
-
-    # Set environment variables using monkeypatch
-    monkeypatch.setenv("DATA__ROOT_DIR", str(root_dir))
-    monkeypatch.setenv("DATA__EXTRACTION_SUBDIR", "extraction")
-    monkeypatch.setenv("DATA__COLLATION_SUBDIR", "collation")
-    monkeypatch.setenv("DATA__USE_USER", "false")
-    monkeypatch.setenv("LOGGING__CONFIG_FILE", str(log_config))
-    monkeypatch.setenv("SERVICES__KEYS__DIR", str(key_dir))
-    monkeypatch.setenv("SERVICES__ANTHROPIC__KEY_FILE_NAME", "anthropic.key")
-    monkeypatch.setenv("SERVICES__ANTHROPIC__MODEL", "gpt-3")
-    monkeypatch.setenv("SERVICES__ANTHROPIC__MAX_TOKENS", "1000")
-
-    return {
-        "root_dir": root_dir,
-        "log_config": log_config,
-        "key_dir": key_dir,
+def build_settings_from_env(settings_tree: dict[str, Path]) -> Settings:
+    # Set all environment variables in one update, restored as a whole afterwards
+    env = {
+        "DATA__ROOT_DIR": str(settings_tree["root_dir"]),
+        "DATA__EXTRACTION_SUBDIR": "extraction",
+        "DATA__COLLATION_SUBDIR": "collation",
+        "DATA__USE_USER": "false",
+        "LOGGING__CONFIG_FILE": str(settings_tree["log_config"]),
+        "SERVICES__KEYS__DIR": str(settings_tree["key_dir"]),
+        "SERVICES__ANTHROPIC__KEY_FILE_NAME": "anthropic.key",
+        "SERVICES__ANTHROPIC__MODEL": "gpt-3",
+        "SERVICES__ANTHROPIC__MAX_TOKENS": "1000",
     }
+    with patch.dict(os.environ, env):
+        return Settings()  # type: ignore
 
 
-def test_settings_from_env(env_setup):
-    settings = Settings()  # type: ignore
+@pytest.mark.parametrize(
+    "build_settings", [build_settings_from_kwargs, build_settings_from_env]
+)
+def test_settings(
+    settings_tree: dict[str, Path],
+    build_settings: T.Callable[[dict[str, Path]], Settings],
+):
+    settings = build_settings(settings_tree)
 
-    assert str(settings.data.root_dir) == str(env_setup["root_dir"])
+    assert str(settings.data.root_dir) == str(settings_tree["root_dir"])
     assert settings.data.extraction_subdir == "extraction"
     assert settings.data.collation_subdir == "collation"
     assert settings.data.use_user is False
-    assert str(settings.logging.config_file) == str(env_setup["log_config"])
-    assert str(settings.services.keys.dir) == str(env_setup["key_dir"])
+    assert str(settings.logging.config_file) == str(settings_tree["log_config"])
+    assert str(settings.services.keys.dir) == str(settings_tree["key_dir"])
     assert settings.services.anthropic.key_file_name == "anthropic.key"
     assert settings.services.anthropic.model == "gpt-3"
     assert settings.services.anthropic.max_tokens == 1000
 
-    # Additional checks
-    assert settings.get_extraction_artifacts_dir().exists()
-    assert settings.get_collation_artifacts_dir().exists()
-    assert settings.get_logger_config_path().exists()
-    assert (
-        Path(settings.services.keys.dir) / settings.services.anthropic.key_file_name
-    ).exists()
+    assert settings.get_data_root_dir() == settings_tree["root_dir"]
+    assert settings.get_extraction_artifacts_dir() == settings_tree["extraction_dir"]
+    assert settings.get_collation_artifacts_dir() == settings_tree["collation_dir"]
+    assert settings.get_logger_config_path() == settings_tree["log_config"]
+    assert settings.get_legacy_data_root_dir() is None
+    assert settings.services.get_anthropic_key() == "test-key"
@@ -1,7 +1,8 @@
+import threading
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
-import bcrypt
 import pytest
 
 import library.user_db as user_db
@@ -17,61 +18,101 @@ from library.user_db import (
 # Test data
 TEST_USERNAME = "testuser"
 TEST_PASSWORD = "testpassword"
-TEST_HASHED_PASSWORD = bcrypt.hashpw(TEST_PASSWORD.encode(), bcrypt.gensalt())
-TEST_HASHED_PASSWORD2 = bcrypt.hashpw("wuppety".encode(), bcrypt.gensalt())
+
+
+@pytest.fixture(autouse=True)
+def clear_db_backend_cache():
+    user_db._detect_db_backend.cache_clear()
+    yield
+    user_db._detect_db_backend.cache_clear()
 
 
 @pytest.mark.parametrize(
-    "postgres_present, sqlite_present, username, password, expected_result",
-    [
-        (True, False, TEST_USERNAME, TEST_PASSWORD, True),
-        (False, True, TEST_USERNAME, TEST_PASSWORD, True),
-        (True, False, TEST_USERNAME, "-.-", False),
-        (False, True, TEST_USERNAME, "-.-", False),
-        (True, False, "-.-", TEST_PASSWORD, False),
-        (False, True, "-.-", TEST_PASSWORD, False),
-    ],
+    "postgres_present, sqlite_present", [(True, False), (False, True)]
 )
 def test_check_is_legit_user(
     postgres_present: bool,
     sqlite_present: bool,
-    username: str,
-    password: str,
-    expected_result: bool,
+    hashed_passwords: dict[bytes, bytes],
 ):
-    if username in user_db.rate_limiter.attempts:
-        user_db.rate_limiter.attempts[username].count = 0
+    cases = [
+        (TEST_USERNAME, TEST_PASSWORD, True),
+        (TEST_USERNAME, "-.-", False),
+        ("-.-", TEST_PASSWORD, False),
+    ]
+
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch(
+                "library.user_db.check_postgresql_db_present",
+                return_value=postgres_present,
+            )
+        )
+        stack.enter_context(
+            patch(
+                "library.user_db.check_sqlite_db_present",
+                return_value=sqlite_present,
+            )
+        )
+        mock_postgres_pw = stack.enter_context(
+            patch("library.user_db.get_user_password_in_postgresql_db")
+        )
+        mock_sqlite_pw = stack.enter_context(
+            patch("library.user_db.get_user_password_in_sqlite_db")
+        )
+
+        for username, password, expected_result in cases:
+            if username in user_db.rate_limiter.attempts:
+                user_db.rate_limiter.attempts[username].count = 0
+
+            db_pw = hashed_passwords[
+                TEST_PASSWORD.encode() if username == TEST_USERNAME else b"wuppety"
+            ]
+            mock_postgres_pw.return_value = db_pw
+            mock_sqlite_pw.return_value = db_pw
+
+            user = User(username=username, password=password)
+            result = check_is_legit_user(user)
+            assert result == expected_result, (username, password)
 
-    db_pw = TEST_HASHED_PASSWORD if username == TEST_USERNAME else TEST_HASHED_PASSWORD2
+
+def test_check_is_legit_user_no_db():
     with patch(
         "library.user_db.check_postgresql_db_present",
-        return_value=postgres_present,
+        return_value=False,
     ), patch(
         "library.user_db.check_sqlite_db_present",
-        return_value=sqlite_present,
-    ), patch(
-        "library.user_db.get_user_password_in_postgresql_db",
-        return_value=db_pw,
-    ), patch(
-        "library.user_db.get_user_password_in_sqlite_db",
-        return_value=db_pw,
+        return_value=False,
     ):
-        user = User(username=username, password=password)
+        user = User(username=TEST_USERNAME, password=TEST_PASSWORD)
         result = check_is_legit_user(user)
-        assert result == expected_result
+        assert result == False
 
 
-def test_check_is_legit_user_no_db():
+def test_get_db_backend_cached():
     with patch(
         "library.user_db.check_postgresql_db_present",
+        return_value=True,
+    ) as mock_postgres, patch(
+        "library.user_db.check_sqlite_db_present",
         return_value=False,
-    ), patch(
+    ):
+        assert user_db.get_db_backend() == "postgresql"
+        assert user_db.get_db_backend() == "postgresql"
+        assert mock_postgres.call_count == 1
+
+
+def test_get_db_backend_no_db_not_cached():
+    with patch(
+        "library.user_db.check_postgresql_db_present",
+        return_value=False,
+    ) as mock_postgres, patch(
         "library.user_db.check_sqlite_db_present",
         return_value=False,
     ):
-        user = User(username=TEST_USERNAME, password=TEST_PASSWORD)
-        result = check_is_legit_user(user)
-        assert result == False
+        assert user_db.get_db_backend() is None
+        assert user_db.get_db_backend() is None
+        assert mock_postgres.call_count == 2
 
 
 # ========== Rate limiting ==========
@@ -124,3 +165,20 @@ def test_rate_limit_exceeded(rate_limiter: RateLimiter):
     )
 
     assert rate_limiter.check_limit_exceeded(username)
+
+
+def test_increment_thread_safe(rate_limiter: RateLimiter):
+    username = "test_user"
+    n_threads, n_increments = 8, 100
+
+    def work():
+        for _ in range(n_increments):
+            rate_limiter.increment(username)
+
+    threads = [threading.Thread(target=work) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert rate_limiter.attempts[username].count == n_threads * n_increments
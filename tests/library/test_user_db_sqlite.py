@@ -1,8 +1,8 @@
 import sqlite3
+import typing as T
 from dataclasses import dataclass
 from pathlib import Path
 
-import bcrypt
 import pytest
 
 from library.user_db import (
@@ -16,32 +16,45 @@ class User:
     username: str
     password: bytes
 
-    @property
-    def hashed_password(self) -> bytes:
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(self.password, salt)
 
-
-@pytest.fixture()
-def temp_sqlite_db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
-    db_dir = tmp_path / "sqlite"
-    db_dir.mkdir(exist_ok=True)
-    db_path = db_dir / "test.db"
-    conn = sqlite3.connect(str(db_path))
+@pytest.fixture(scope="session")
+def template_sqlite_db(
+    hashed_passwords: dict[bytes, bytes],
+) -> T.Generator[sqlite3.Connection, None, None]:
+    # built once in memory, each test gets a page level copy via the backup api
+    conn = sqlite3.connect(":memory:")
     cursor = conn.cursor()
 
     # Create a simple table
     cursor.execute("""CREATE TABLE user
-                      (username TEXT PRIMARY KEY, hashed_password TEXT)""")
+                      (username TEXT PRIMARY KEY, hashed_password BLOB NOT NULL)
+                      WITHOUT ROWID""")
     users = [
         User(username="user1", password=b"wup"),
         User(username="user2", password=b"wuppety"),
     ]
 
     statement = "INSERT INTO user VALUES(?, ?)"
-    cursor.executemany(statement, [(u.username, u.hashed_password) for u in users])
-
+    cursor.executemany(
+        statement, [(u.username, hashed_passwords[u.password]) for u in users]
+    )
     conn.commit()
+
+    yield conn
+    conn.close()
+
+
+@pytest.fixture()
+def temp_sqlite_db(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    template_sqlite_db: sqlite3.Connection,
+) -> Path:
+    db_dir = tmp_path / "sqlite"
+    db_dir.mkdir(exist_ok=True)
+    db_path = db_dir / "test.db"
+    conn = sqlite3.connect(str(db_path))
+    template_sqlite_db.backup(conn)
     conn.close()
 
     # Change the working directory to the temporary directory
@@ -71,7 +84,11 @@ def test_check_sqlite_db_missing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch
     ],
 )
 def test_get_user_password_in_sqlite_db(
-    monkeypatch: pytest.MonkeyPatch, temp_sqlite_db: Path, user: str, password: bytes
+    monkeypatch: pytest.MonkeyPatch,
+    temp_sqlite_db: Path,
+    checkpw: T.Callable[[bytes, bytes], bool],
+    user: str,
+    password: bytes,
 ):
     monkeypatch.chdir(temp_sqlite_db.parent)
     assert temp_sqlite_db.exists()
@@ -79,7 +96,7 @@ def test_get_user_password_in_sqlite_db(
         user, db_name=temp_sqlite_db.name
     )
     try:
-        assert bcrypt.checkpw(password, retrieved_password)
+        assert checkpw(password, retrieved_password)
     except ValueError as e:
         if password != b"":
             raise e
@@ -1,4 +1,5 @@
 import base64
+import io
 import shutil
 import zipfile
 from pathlib import Path
@@ -9,6 +10,7 @@ import pytest
 import requests
 from PIL import Image, ImageChops
 
+from library.schemas import CATEGORY_DTYPE
 from library.settings import (
     AnthropicService,
     Data,
@@ -20,23 +22,35 @@ from library.settings import (
 )
 from library.utils import (
     ID_COL,
+    NORMALIZED_NAME_COL,
+    SHOP_COLS,
     base64_encode_image_bytes,
     check_available_extraction_dirs,
     cleanup,
     collect,
     compile_infos,
     create_zipfile,
+    create_zipfile_bytes,
     get_compiled_paths,
+    get_image_hash,
     internet_connection,
+    prepare_vlm_image,
     put_id_col_at_end,
-    read_and_b64_encode_image,
     read_image_as_bytes,
     save_image_as_jpg_file,
+    scan_infos,
+    update_compiled_infos,
     write_excel_workbook,
+    write_manifest,
 )
 
 
 # ======= test def internet_connection =======
+@pytest.fixture(autouse=True)
+def clear_internet_connection_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("library.utils._last_internet_check", None)
+
+
 @pytest.mark.parametrize(
     "status_code,expected",
     [
@@ -51,24 +65,40 @@ def test_internet_connection_status_codes(status_code: int, expected: bool):
         assert internet_connection() is expected
 
 
-def test_internet_connection_timeout():
-    with patch("requests.get", side_effect=requests.Timeout):
+@pytest.mark.parametrize(
+    "exception",
+    [requests.Timeout, requests.ConnectionError, requests.RequestException],
+)
+def test_internet_connection_exceptions(exception: type[requests.RequestException]):
+    with patch("requests.get", side_effect=exception):
         assert internet_connection() is False
 
 
-def test_internet_connection_connection_error():
-    with patch("requests.get", side_effect=requests.ConnectionError):
-        assert internet_connection() is False
+def test_internet_connection_cached_within_ttl():
+    with patch("requests.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        assert internet_connection() is True
+        assert internet_connection() is True
+    assert mock_get.call_count == 1
 
 
-def test_internet_connection_request_exception():
-    with patch("requests.get", side_effect=requests.RequestException):
+def test_internet_connection_rechecked_after_ttl(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("library.utils.INTERNET_CHECK_TTL", 0.0)
+    with patch("requests.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        assert internet_connection() is True
+        mock_get.return_value.status_code = 500
         assert internet_connection() is False
+    assert mock_get.call_count == 2
 
 
 # ======= test def check_available_extraction_dirs =======
 @pytest.fixture
-def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+def settings(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    static_settings_files: tuple[Path, Path],
+):
     dummy_dir = tmp_path / "dummy"
     dummy_dir.mkdir()
     monkeypatch.chdir(dummy_dir)
@@ -79,12 +109,8 @@ def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     extraction_dir.mkdir()
     collation_dir = root_dir / "collation"
     collation_dir.mkdir()
-    log_config = tmp_path / "logging.conf"
-    log_config.touch()
-    key_dir = tmp_path / "keys"
-    key_dir.mkdir()
-    key_file = key_dir / "anthropic.key"
-    key_file.write_text("test-key\n")
+    log_config, key_file = static_settings_files
+    key_dir = key_file.parent
 
     # Set environment variables using monkeypatch
     monkeypatch.setenv("DATA__ROOT_DIR", str(root_dir))
@@ -129,9 +155,6 @@ def test_check_available_extraction_dirs_with_files(settings: Settings):
     assert shop_info_files[0] == file1
     assert items_info_files[0] == file2
 
-    shutil.rmtree(dir1)
-    shutil.rmtree(dir2)
-
 
 def test_check_available_extraction_dirs_ignore_root_files(settings: Settings):
     root_dir = settings.get_extraction_artifacts_dir()
@@ -148,9 +171,6 @@ def test_check_available_extraction_dirs_ignore_root_files(settings: Settings):
     assert len(shop_info_files) == 0
     assert len(items_info_files) == 0
 
-    file1.unlink()
-    file2.unlink()
-
 
 def test_check_available_extraction_dirs_multiple_files(settings: Settings):
     root_dir = settings.get_extraction_artifacts_dir()
@@ -181,9 +201,24 @@ def test_check_available_extraction_dirs_multiple_files(settings: Settings):
     assert set(shop_info_files) == {file1, file2}
     assert set(items_info_files) == {file3, file4}
 
-    shutil.rmtree(dir1)
-    shutil.rmtree(dir2)
-    shutil.rmtree(dir3)
+
+def test_check_available_extraction_dirs_nested(settings: Settings):
+    root_dir = settings.get_extraction_artifacts_dir()
+    file_names = StoredFileNames()
+
+    nested_dir = root_dir / "dir1" / "nested"
+    nested_dir.mkdir(parents=True)
+
+    file1 = nested_dir / file_names.shop_info_parquet
+    file1.touch()
+    file2 = nested_dir / file_names.items_info_parquet
+    file2.touch()
+    (nested_dir / "unrelated.parquet").touch()
+
+    shop_info_files, items_info_files = check_available_extraction_dirs(settings)
+
+    assert shop_info_files == [file1]
+    assert items_info_files == [file2]
 
 
 # ======= test def compile_infos =======
@@ -206,7 +241,6 @@ def test_compile_infos_single_file(tmp_path: Path):
     assert result.shape == (2, 3)  # 2 rows, 3 columns (col1, col2, ID_COL)
     assert ID_COL in result.columns
     assert all(result[ID_COL] == tmp_path.name)
-    info_file.unlink()
 
 
 def test_compile_infos_multiple_files(tmp_path: Path):
@@ -227,8 +261,6 @@ def test_compile_infos_multiple_files(tmp_path: Path):
     assert result.shape == (4, 3)  # 4 rows, 3 columns (col1, col2, ID_COL)
     assert ID_COL in result.columns
     assert set(result[ID_COL].unique()) == {dir1.name, dir2.name}
-    shutil.rmtree(dir1)
-    shutil.rmtree(dir2)
 
 
 def test_compile_infos_empty_list():
@@ -255,8 +287,35 @@ def test_compile_infos_different_schemas(tmp_path: Path):
     assert set(result.columns) == {"col1", "col2", "col3", ID_COL}
     assert result["col2"].null_count() == 2
     assert result["col3"].null_count() == 2
-    shutil.rmtree(dir1)
-    shutil.rmtree(dir2)
+
+
+def test_compile_infos_string_and_enum_category(tmp_path: Path):
+    dir1 = tmp_path / "dir1"
+    dir1.mkdir()
+    info_file1 = create_test_parquet(dir1, "info1.parquet", {"category": ["Dairy"]})
+    dir2 = tmp_path / "dir2"
+    dir2.mkdir()
+    info_file2 = dir2 / "info2.parquet"
+    pl.DataFrame(
+        {"category": ["Meat"]}, schema={"category": CATEGORY_DTYPE}
+    ).write_parquet(info_file2)
+
+    result = compile_infos([info_file1, info_file2])
+
+    assert sorted(result["category"].to_list()) == ["Dairy", "Meat"]
+
+
+def test_scan_infos_projection(tmp_path: Path):
+    info_file = create_test_parquet(
+        tmp_path, "info1.parquet", {"col1": [1, 2], "col2": ["a", "b"]}
+    )
+
+    result = scan_infos([info_file])
+    assert isinstance(result, pl.LazyFrame)
+
+    result = result.select(["col2", ID_COL]).collect()
+    assert result.columns == ["col2", ID_COL]
+    assert result["col2"].to_list() == ["a", "b"]
 
 
 def test_compile_infos_file_not_found(tmp_path):
@@ -316,8 +375,6 @@ def test_collect_creates_output_files(settings: Settings):
     assert (collation_dir / file_names.shop_info_parquet).exists()
     assert (collation_dir / file_names.items_info_parquet).exists()
 
-    shutil.rmtree(dummy_dir)
-
 
 def test_collect_compiles_data_correctly(settings: Settings):
     file_names = StoredFileNames()
@@ -380,6 +437,94 @@ def test_collect_compiles_data_correctly(settings: Settings):
     assert "pretty name" in compiled_items_info.columns
 
 
+def write_dummy_shop_info(path: Path, name: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame(
+        {"name": [name], "date": ["2023-01-01"], "time": ["12:00"], "total": [100.0]}
+    ).write_parquet(path)
+
+
+def test_collect_incremental(settings: Settings):
+    file_names = StoredFileNames()
+    extraction_dir = settings.get_extraction_artifacts_dir()
+    compiled_shop_info_path, _ = get_compiled_paths(settings)
+
+    for name in ["dummy1", "dummy2", "dummy3"]:
+        write_dummy_shop_info(
+            extraction_dir / name / file_names.shop_info_parquet, name
+        )
+
+    shop_info_files, _ = check_available_extraction_dirs(settings)
+    compiled, manifest = update_compiled_infos(
+        shop_info_files, compiled_shop_info_path, SHOP_COLS
+    )
+    assert compiled is not None
+    assert len(compiled) == 3
+    compiled.write_parquet(compiled_shop_info_path)
+    write_manifest(compiled_shop_info_path, manifest)
+
+    # nothing changed
+    compiled, _ = update_compiled_infos(
+        shop_info_files, compiled_shop_info_path, SHOP_COLS
+    )
+    assert compiled is None
+
+    # one changed, one removed, one added
+    write_dummy_shop_info(
+        extraction_dir / "dummy1" / file_names.shop_info_parquet, "changed"
+    )
+    shutil.rmtree(extraction_dir / "dummy2")
+    write_dummy_shop_info(
+        extraction_dir / "dummy4" / file_names.shop_info_parquet, "dummy4"
+    )
+
+    shop_info_files, _ = check_available_extraction_dirs(settings)
+    compiled, _ = update_compiled_infos(
+        shop_info_files, compiled_shop_info_path, SHOP_COLS
+    )
+    assert compiled is not None
+    assert dict(zip(compiled[ID_COL], compiled["name"])) == {
+        "dummy1": "changed",
+        "dummy3": "dummy3",
+        "dummy4": "dummy4",
+    }
+
+
+def test_collect_rebuilds_on_name_map_change(
+    settings: Settings, monkeypatch: pytest.MonkeyPatch
+):
+    file_names = StoredFileNames()
+    items_file = (
+        settings.get_extraction_artifacts_dir()
+        / "dummy"
+        / file_names.items_info_parquet
+    )
+    items_file.parent.mkdir()
+    pl.DataFrame(
+        {
+            "name": ["BIOD BANANEN"],
+            "price": [1.0],
+            "count": [1],
+            "mass": [1.0],
+            "tax": [0.1],
+            "category": ["Fruit"],
+        }
+    ).write_parquet(items_file)
+    write_dummy_shop_info(items_file.parent / file_names.shop_info_parquet, "shop")
+    _, compiled_items_info_path = get_compiled_paths(settings)
+
+    monkeypatch.setattr("library.names.NAME_MAP", {"BIOD BANANEN": "BIO BANANEN"})
+    collect(settings)
+    compiled = pl.read_parquet(compiled_items_info_path)
+    assert compiled[NORMALIZED_NAME_COL].to_list() == ["BIO BANANEN"]
+
+    # no receipt changed, but the normalized names have to follow the new map
+    monkeypatch.setattr("library.names.NAME_MAP", {"BIOD BANANEN": "Bananen"})
+    collect(settings)
+    compiled = pl.read_parquet(compiled_items_info_path)
+    assert compiled[NORMALIZED_NAME_COL].to_list() == ["Bananen"]
+
+
 # ======= test def create_zipfile =======
 
 
@@ -449,6 +594,41 @@ def test_create_zipfile_nonexistent_directory(tmp_path):
         create_zipfile(non_existent_path)
 
 
+def test_create_zipfile_bytes_contents(tmp_path: Path):
+    file1 = tmp_path / "file1.txt"
+    file1.write_text("Test content 1")
+    subdir = tmp_path / "subdir"
+    subdir.mkdir()
+    file2 = subdir / "file2.txt"
+    file2.write_text("Test content 2")
+
+    archive_bytes = create_zipfile_bytes(tmp_path)
+
+    with zipfile.ZipFile(io.BytesIO(archive_bytes), "r") as zip_ref:
+        assert zip_ref.read("file1.txt").decode() == "Test content 1"
+        assert zip_ref.read("subdir/file2.txt").decode() == "Test content 2"
+
+
+def test_create_zipfile_bytes_compress_types(tmp_path: Path):
+    image_file = tmp_path / "original-image.jpg"
+    image_file.write_bytes(b"jpeg bytes" * 100)
+    json_file = tmp_path / "shop-info.json"
+    json_file.write_text('{"name": "shop"}' * 100)
+
+    archive_bytes = create_zipfile_bytes(tmp_path)
+
+    with zipfile.ZipFile(io.BytesIO(archive_bytes), "r") as zip_ref:
+        assert zip_ref.getinfo(image_file.name).compress_type == zipfile.ZIP_STORED
+        assert zip_ref.getinfo(json_file.name).compress_type == zipfile.ZIP_DEFLATED
+        assert zip_ref.read(image_file.name) == image_file.read_bytes()
+        assert zip_ref.read(json_file.name) == json_file.read_bytes()
+
+
+def test_create_zipfile_bytes_nonexistent_directory(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        create_zipfile_bytes(tmp_path / "nonexistent")
+
+
 # ======= test def create_zipfile =======
 
 
@@ -484,7 +664,11 @@ def test_put_id_col_at_end():
 
 # ======= test def write_excel_workbook =======
 @pytest.fixture
-def mock_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Settings:
+def mock_settings(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    static_settings_files: tuple[Path, Path],
+) -> Settings:
     dummy_dir = tmp_path / "dummy"
     dummy_dir.mkdir()
     monkeypatch.chdir(dummy_dir)
@@ -495,12 +679,8 @@ def mock_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Settings:
     extraction_dir.mkdir()
     collation_dir = root_dir / "collation"
     collation_dir.mkdir()
-    log_config = tmp_path / "logging.conf"
-    log_config.touch()
-    key_dir = tmp_path / "keys"
-    key_dir.mkdir()
-    key_file = key_dir / "anthropic.key"
-    key_file.write_text("test-key\n")
+    log_config, key_file = static_settings_files
+    key_dir = key_file.parent
 
     settings = Settings(
         data=Data(
@@ -563,8 +743,8 @@ def test_write_excel_workbook(
     assert excel_path.name == "groceries-data.xlsx"
 
     # Read the Excel file to verify its contents
-    shops_disk = pl.read_excel(excel_path, sheet_name="Shops", engine="openpyxl")
-    items_disk = pl.read_excel(excel_path, sheet_name="Items", engine="openpyxl")
+    shops_disk = pl.read_excel(excel_path, sheet_name="Shops", engine="calamine")
+    items_disk = pl.read_excel(excel_path, sheet_name="Items", engine="calamine")
 
     shops, items = sample_data
 
@@ -581,6 +761,19 @@ def test_write_excel_workbook(
     assert items_disk.equals(items)
 
 
+def test_write_excel_workbook_from_dataframes(mock_settings: Settings):
+    shops = pl.DataFrame({"name": ["Shop A"], ID_COL: [1]})
+    items = pl.DataFrame({"name": ["Item 1"], "price": [1.5], ID_COL: [1]})
+
+    # no compiled parquets exist, so the passed frames must be used
+    excel_path = write_excel_workbook(mock_settings, shops=shops, items=items)
+
+    shops_disk = pl.read_excel(excel_path, sheet_name="Shops", engine="calamine")
+    items_disk = pl.read_excel(excel_path, sheet_name="Items", engine="calamine")
+    assert shops_disk.equals(shops)
+    assert items_disk.equals(items)
+
+
 # ======= test def cleanup =======
 def test_cleanup_removes_existing_directories(settings: Settings):
     # Create some dummy files in the directories
@@ -670,18 +863,8 @@ def test_base64_encode_image_bytes_simple():
     assert result == expected_result, "Encoding mismatch for simple byte string"
 
 
-def test_base64_encode_image_bytes_actual_image(tmp_path: Path):
-    # Create a dummy image file
-    image_path = tmp_path / "test_image.png"
-    dummy_image_data = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82"
-
-    with image_path.open("wb") as f:
-        f.write(dummy_image_data)
-
-    with image_path.open("rb") as image_file:
-        image_bytes = image_file.read()
-
-    expected_result = base64.b64encode(image_bytes).decode("utf-8")
+def test_base64_encode_image_bytes_actual_image(dummy_png_b64: tuple[bytes, str]):
+    image_bytes, expected_result = dummy_png_b64
     result = base64_encode_image_bytes(image_bytes)
     assert result == expected_result, "Encoding mismatch for actual image bytes"
 
@@ -691,25 +874,6 @@ def test_base64_encode_image_bytes_invalid_input():
         base64_encode_image_bytes("Not a bytes object")  # type: ignore
 
 
-@pytest.fixture
-def temp_image_file(tmp_path: Path) -> Path:
-    image_path = tmp_path / "test_image.jpg"
-    image_path.write_bytes(b"fake image content")
-    return image_path
-
-
-def test_read_and_b64_encode_image_valid(temp_image_file: Path):
-    result = read_and_b64_encode_image(temp_image_file)
-    assert isinstance(result, str)
-    decoded = base64.b64decode(result.encode("utf-8"))
-    assert decoded == b"fake image content"
-
-
-def test_read_and_b64_encode_image_non_existent():
-    with pytest.raises(FileNotFoundError):
-        read_and_b64_encode_image(Path("non_existent.jpg"))
-
-
 @pytest.fixture
 def temp_dir(tmp_path: Path) -> Path:
     return tmp_path / "test_images"
@@ -743,33 +907,30 @@ def test_save_image_as_jpg_success(temp_dir: Path):
     assert image_path.exists()
 
 
-def test_save_image_as_jpg_success_file_exists_no_overwrite(temp_dir: Path):
-    temp_dir.mkdir(parents=True)
-    file_path = temp_dir / "test.jpg"
-    file_path.touch()
-    save_image_as_jpg_file(
-        image_path=file_path, image=b"new content", overwrite=False, mkdir=True
-    )
-    assert file_path.read_bytes() == b""
-
-
-def test_save_image_as_jpg_success_file_exists_with_overwrite(temp_dir: Path):
+@pytest.mark.parametrize("overwrite,expected", [(False, b""), (True, b"new content")])
+def test_save_image_as_jpg_success_file_exists(
+    temp_dir: Path, overwrite: bool, expected: bytes
+):
     temp_dir.mkdir(parents=True)
     file_path = temp_dir / "test.jpg"
     file_path.touch()
-    image = b"new content"
     save_image_as_jpg_file(
-        image_path=file_path, image=image, overwrite=True, mkdir=True
+        image_path=file_path, image=b"new content", overwrite=overwrite, mkdir=True
     )
-    assert file_path.read_bytes() == image
+    assert file_path.read_bytes() == expected
 
 
 def test_save_image_as_jpg_success_save_pil_image(
     temp_dir: Path, sample_image_pil: Image.Image
 ):
     file_path = temp_dir / "test.jpg"
+    # lowest quality keeps the encode cheap, the test only checks a jpeg is written
     save_image_as_jpg_file(
-        image_path=file_path, image=sample_image_pil, overwrite=True, mkdir=True
+        image_path=file_path,
+        image=sample_image_pil,
+        overwrite=True,
+        mkdir=True,
+        quality=1,
     )
     assert file_path.exists()
     _ = Image.open(file_path, formats=["JPEG", "JPG"])
@@ -784,3 +945,37 @@ def test_save_image_as_jpg_invalid_image_type(temp_dir: Path):
             overwrite=True,
             mkdir=True,
         )
+
+
+def test_get_image_hash_bytes_file_and_path_match(tmp_path: Path):
+    image_bytes = b"not really an image" * 1000
+    path = tmp_path / "image.jpg"
+    path.write_bytes(image_bytes)
+
+    with path.open("rb") as f:
+        file_hash = get_image_hash(f)
+
+    assert get_image_hash(image_bytes) == file_hash
+    assert get_image_hash(io.BytesIO(image_bytes)) == file_hash
+    assert get_image_hash(path) == file_hash
+
+
+# ======= test def prepare_vlm_image =======
+
+
+@pytest.mark.parametrize(
+    "size,expected_size",
+    [
+        ((3000, 4000), (1176, 1568)),
+        ((100, 200), (100, 200)),
+    ],
+)
+def test_prepare_vlm_image(size: tuple[int, int], expected_size: tuple[int, int]):
+    image = Image.new("RGBA", size, color="red")
+
+    result = prepare_vlm_image(image)
+
+    assert image.size == size  # passed image is not modified
+    prepared = Image.open(io.BytesIO(result), formats=["JPEG"])
+    assert prepared.size == expected_size
+    assert prepared.mode == "RGB"
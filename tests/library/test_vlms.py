@@ -1,7 +1,8 @@
-import base64
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import anthropic
+import httpx
 import instructor
 import pytest
 from anthropic import Anthropic
@@ -19,7 +20,11 @@ from library.settings import (
 
 
 @pytest.fixture
-def mock_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Settings:
+def mock_settings(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    static_settings_files: tuple[Path, Path],
+) -> Settings:
     dummy_dir = tmp_path / "dummy"
     dummy_dir.mkdir()
     monkeypatch.chdir(dummy_dir)
@@ -30,12 +35,8 @@ def mock_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Settings:
     extraction_dir.mkdir()
     collation_dir = root_dir / "collation"
     collation_dir.mkdir()
-    log_config = tmp_path / "logging.conf"
-    log_config.touch()
-    key_dir = tmp_path / "keys"
-    key_dir.mkdir()
-    key_file = key_dir / "anthropic.key"
-    key_file.write_text("test-key\n")
+    log_config, key_file = static_settings_files
+    key_dir = key_file.parent
 
     settings = Settings(
         data=Data(
@@ -62,8 +63,18 @@ def test_get_anthropic_client(mock_settings: Settings):
     assert isinstance(client, instructor.Instructor)
 
 
-def test_create_anthropic_messages():
-    base64_image = base64.b64encode(b"dummy image data").decode("utf-8")
+def test_get_anthropic_client_reused(mock_settings: Settings):
+    client0 = vlms.get_anthropic_client(mock_settings.services)
+    client1 = vlms.get_anthropic_client(mock_settings.services.model_copy())
+    assert client0 is client1
+
+    other_services = mock_settings.services.model_copy(deep=True)
+    other_services.anthropic.key = "other-key"
+    assert vlms.get_anthropic_client(other_services) is not client0
+
+
+def test_create_anthropic_messages(dummy_png_b64: tuple[bytes, str]):
+    _, base64_image = dummy_png_b64
     messages = vlms.create_anthropic_messages(base64_image)
 
     assert len(messages) == 1
@@ -74,9 +85,34 @@ def test_create_anthropic_messages():
     assert messages[0]["content"][1]["source"]["data"] == base64_image
 
 
-def test_make_anthropic_request_fail(mock_settings: Settings):
+def test_make_anthropic_request_fail(
+    mock_settings: Settings, dummy_png_b64: tuple[bytes, str]
+):
+    # the request is rejected before it leaves the client, as the api would for a bad key
+    _, base64_image = dummy_png_b64
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    auth_error = anthropic.AuthenticationError(
+        "invalid x-api-key",
+        response=httpx.Response(401, request=request),
+        body=None,
+    )
+    client = vlms.get_anthropic_client(mock_settings.services)
+    with patch(
+        "anthropic._base_client.SyncAPIClient.request", side_effect=auth_error
+    ) as mock_request:
+        with pytest.raises(InstructorRetryException):
+            _ = vlms.make_anthropic_request(
+                base64_image, client, mock_settings.services, max_retries=1
+            )
+    mock_request.assert_called_once()
+
+
+@pytest.mark.network
+def test_make_anthropic_request_fail_live(
+    mock_settings: Settings, dummy_png_b64: tuple[bytes, str]
+):
     # passing of arguments needs to be correct and then the client request fail because of incorrect creds
-    base64_image = base64.b64encode(b"dummy image data").decode("utf-8")
+    _, base64_image = dummy_png_b64
     client = vlms.get_anthropic_client(mock_settings.services)
     with pytest.raises(InstructorRetryException):
         _ = vlms.make_anthropic_request(
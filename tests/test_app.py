@@ -1,33 +1,56 @@
 import pytest
 from playwright.sync_api import Page, expect
 
+# counts script runs in the page, a fast rerun can start and finish between two polls
+WATCH_SCRIPT_RUNS = """() => {
+    window.__scriptRunObserver?.disconnect();
+    window.__scriptRuns = 0;
+    const app = document.querySelector('[data-testid="stApp"]');
+    window.__scriptRunObserver = new MutationObserver(() => {
+        if (app.getAttribute("data-test-script-state") === "running") {
+            window.__scriptRuns += 1;
+        }
+    });
+    window.__scriptRunObserver.observe(app, {
+        attributes: true,
+        attributeFilter: ["data-test-script-state"],
+    });
+}"""
+
+
+def wait_for_script_idle(page: Page):
+    expect(page.get_by_test_id("stApp")).to_have_attribute(
+        "data-test-script-state", "notRunning"
+    )
+
+
+def submit_login_form(page: Page):
+    page.evaluate(WATCH_SCRIPT_RUNS)
+    page.get_by_test_id("stBaseButton-secondaryFormSubmit").click()
+    # the rerun of this submit has to start and finish, otherwise the alert
+    # checked afterwards may still be the one of the previous attempt
+    page.wait_for_function("() => window.__scriptRuns > 0")
+    wait_for_script_idle(page)
+
 
 @pytest.mark.server
 def test_reject_improper_login_attempts(page: Page) -> None:
     page.goto("http://localhost:8501/")
+    wait_for_script_idle(page)
+    login_alert = page.get_by_test_id("stAlert").get_by_role("paragraph")
 
-    page.get_by_test_id("stBaseButton-secondaryFormSubmit").click()
-    expect(page.get_by_test_id("stAlert").get_by_role("paragraph")).to_contain_text(
-        "Login failed"
-    )
+    submit_login_form(page)
+    expect(login_alert).to_contain_text("Login failed")
 
-    page.get_by_label("username").click()
+    # fill focuses the input itself, no click needed
     page.get_by_label("username").fill("user")
-    page.get_by_test_id("stBaseButton-secondaryFormSubmit").click()
-    expect(page.get_by_test_id("stAlert").get_by_role("paragraph")).to_contain_text(
-        "Login failed"
-    )
+    submit_login_form(page)
+    expect(login_alert).to_contain_text("Login failed")
 
-    page.get_by_label("password", exact=True).click()
     page.get_by_label("password", exact=True).fill("dummy")
-    page.get_by_test_id("stBaseButton-secondaryFormSubmit").click()
-    expect(page.get_by_test_id("stAlert").get_by_role("paragraph")).to_contain_text(
-        "Login failed"
-    )
+    submit_login_form(page)
+    expect(login_alert).to_contain_text("Login failed")
 
-    page.get_by_label("username").click()
     page.get_by_label("username").fill("")
-    page.get_by_test_id("stBaseButton-secondaryFormSubmit").click()
-    expect(page.get_by_test_id("stAlert").get_by_role("paragraph")).to_contain_text(
-        "Login failed"
-    )
+    submit_login_form(page)
+    expect(login_alert).to_contain_text("Login failed")